@@ -1,46 +1,89 @@
-from fastapi import APIRouter, UploadFile, File, HTTPException
-import pandas as pd
+from fastapi import APIRouter, UploadFile, File, HTTPException, BackgroundTasks, Query
+from typing import Optional
+from app.config import config
 from app.core.retrieval import get_vectorstore
-from app.utils.document_builder import build_documents_from_csv
+from app.services.ingestion import ingestion_jobs, create_ingestion_job, run_ingestion_job
+import aiofiles
 import logging
-from more_itertools import chunked
+import os
+import uuid
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
 
+DEFAULT_LISTINGS_PATH = "data/real_estate_listings_750_final.csv"
+
+# Read uploads in 1 MiB pieces so large feeds are never held in memory
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
 
 @router.post("/listings")
-async def ingest_listings():
+async def ingest_listings(
+    background_tasks: BackgroundTasks,
+    file: Optional[UploadFile] = File(None),
+    prune: bool = Query(True, description="Remove listings that are not in the feed"),
+):
     """
     Ingest a CSV file of real estate listings and add them to the vectorstore.
     If no file is uploaded, fallback to local path.
+    Ingestion is incremental: unchanged listings are skipped, changed ones are
+    replaced and listings no longer in the file are removed.
+    Returns a job ID; poll /ingest/jobs/{job_id} for progress.
     """
     try:
-        # Read DataFrame from upload or fallback
-        csv_path = "data/real_estate_listings_750_final.csv"
-        df = pd.read_csv(csv_path)
-
-        # Build LangChain documents
-        documents = build_documents_from_csv(df)
-        logger.info(f"Built {len(documents)} document chunks")
-
-        # Batch insert into vectorstore (Chroma max batch size ~5461)
-        batch_size = 5000
-        total = 0
         vectorstore = get_vectorstore()
+        job_id = str(uuid.uuid4())
 
-        for batch in chunked(documents, batch_size):
-            vectorstore.add_documents(batch)
-            total += len(batch)
+        if file is not None:
+            if not file.filename.lower().endswith(".csv"):
+                raise HTTPException(status_code=400, detail="Unsupported file type. Use .csv")
 
-        logger.info(f"Ingested {total} documents into vectorstore")
+            # Spool the upload to disk so the pipeline can stream it
+            os.makedirs(config.INGEST_UPLOAD_DIR, exist_ok=True)
+            csv_path = os.path.join(config.INGEST_UPLOAD_DIR, f"{job_id}.csv")
+            async with aiofiles.open(csv_path, "wb") as spool:
+                while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                    await spool.write(chunk)
+            source, cleanup = file.filename, True
+        else:
+            csv_path = DEFAULT_LISTINGS_PATH
+            if not os.path.exists(csv_path):
+                raise HTTPException(status_code=400, detail=f"No file uploaded and {csv_path} not found")
+            source, cleanup = csv_path, False
 
-        return {
-            "status": "success",
-            "rows_read": len(df),
-            "chunks_ingested": total,
-        }
+        create_ingestion_job(job_id, source)
+        background_tasks.add_task(
+            run_ingestion_job,
+            job_id=job_id,
+            csv_path=csv_path,
+            vectorstore=vectorstore,
+            prune=prune,
+            cleanup=cleanup
+        )
 
+        logger.info(f"Queued ingestion job {job_id} for {source}")
+        return {"status": "queued", "job_id": job_id}
+
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Failed to ingest listings")
-        raise HTTPException(status_code=500, detail=f"Error during ingestion: {e}")
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=f"Error during ingestion: {e}")
+
+
+@router.get("/jobs")
+def list_ingestion_jobs():
+    """
+    Returns progress for all ingestion jobs.
+    """
+    return list(ingestion_jobs.values())
+
+
+@router.get("/jobs/{job_id}")
+def get_ingestion_job(job_id: str):
+    """
+    Retrieve progress for a given ingestion job
+    """
+    if job_id not in ingestion_jobs:
+        raise HTTPException(status_code=404, detail="Job ID not found")
+    return ingestion_jobs[job_id]
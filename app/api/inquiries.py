@@ -1,68 +1,94 @@
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends, BackgroundTasks, Query
-import io
-import pandas as pd
-from typing import List, Optional, Dict, Any
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import FileResponse, StreamingResponse
+from typing import List, Optional, Any
 from sqlalchemy.orm import Session
 from app.schemas import (
     BatchJobResponse,
+    BatchJobResultItem,
+    BatchJobResultsPage,
     JobMetadata,
     InquiryRequest,
     InquiryResponse,
     InquiryHistoryResponse,
+    InquiryHistoryPage,
     BatchInquiryRequest,
     InquiryAnalyticsResponse,
     InquiryStatusResponse
 )
-from app.services.processor import process_inquiry
-from app.services.batch_processor import process_batch_inquiries
+from app.services.idempotency import InquiryConflict, deduplicator
+from app.services.processor import astream_inquiry
+from app.services.batch_upload import run_batch_upload, upload_format
+from app.services import job_store
+from app.config import config
 # from app.services.analytics_service import get_inquiry_analytics
 from app.db.session import get_db
 from app.db.models import InquiryHistory
-from app.core.retrieval import get_retriever
-from sqlalchemy import func, desc, and_
-from datetime import datetime, timedelta
+from app.core import retrieval
+from app.services.response_cache import response_cache
+from app.services.health import health_prober
+from app.services.analytics import get_analytics
+from app.services.history_writer import HistoryBackpressure, history_entry, history_writer
+from app.services.search_index import SEARCH_FIELDS, search_history
+from sqlalchemy import desc, and_, tuple_
+from datetime import datetime
 import logging
 import uuid
 import json
+import base64
+import os
+import aiofiles
 
 logger = logging.getLogger(__name__)
 router = APIRouter()
 
+# Read uploads in 1 MiB pieces so large batch files are never held in memory
+UPLOAD_CHUNK_BYTES = 1024 * 1024
+
 
 # Core inquiry processing endpoints
 @router.post("/process", response_model=InquiryResponse)
-async def process_single_inquiry(
-    request: InquiryRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db)
-):
+async def process_single_inquiry(request: InquiryRequest):
     """
     Process a single real estate inquiry with AI-powered response generation
     """
     try:
+        # Shed load before spending LLM calls on a result we could not persist
+        if history_writer.saturated():
+            raise HistoryBackpressure("Inquiry history queue is full")
+
         logger.info(f"Processing inquiry from {request.email}")
         
         # Generate unique processing ID for tracking
         processing_id = str(uuid.uuid4())
         
-        # Process the inquiry
-        result = process_inquiry(request)
+        # Process the inquiry without blocking the event loop; a repeated
+        # inquiry_id returns the stored result instead of running again
+        result = await deduplicator.process_once(request)
         
         # Add processing metadata
         result['processing_id'] = processing_id
         result['processed_at'] = datetime.utcnow().isoformat()
         
-        # Save to database in background
-        background_tasks.add_task(
-            save_inquiry_to_db,
-            request=request,
-            result=result,
-            db_session=db
-        )
+        # Persisted (with its reply email) by the write-behind history writer
+        if not result.get("replayed"):
+            try:
+                await run_in_threadpool(history_writer.submit, [history_entry(request, result)])
+            except HistoryBackpressure:
+                # Not saved, so a retry must run it again rather than replay it
+                deduplicator.forget(request)
+                raise
         
         logger.info(f"Inquiry processed successfully with ID: {processing_id}")
         return InquiryResponse(**result)
         
+    except HistoryBackpressure as e:
+        logger.warning(f"Rejecting inquiry from {request.email}: {e}")
+        raise HTTPException(status_code=503, detail=str(e), headers={"Retry-After": "5"})
+    except InquiryConflict as e:
+        logger.warning(f"Rejecting inquiry from {request.email}: {e}")
+        raise HTTPException(status_code=409, detail=str(e))
     except Exception as e:
         logger.error(f"Error processing inquiry: {e}")
         raise HTTPException(
@@ -71,99 +97,248 @@ async def process_single_inquiry(
         )
 
 
-# In-memory progress tracker
-job_progress = {}
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(jsonable_encoder(data))}\n\n"
+
+
+@router.post("/process/stream")
+async def process_single_inquiry_stream(request: InquiryRequest):
+    """
+    Process a single inquiry, streaming progress as server-sent events.
+
+    Events: "stage" as each pipeline stage finishes, "category", "listings"
+    with the retrieved listing IDs, "token" for each chunk of generated text,
+    "error" if generation fails, and a final "result" carrying the full
+    InquiryResponse. A repeated inquiry_id streams only the stored result; one
+    already used for a different inquiry is rejected with 409.
+    """
+    if history_writer.saturated():
+        raise HTTPException(status_code=503, detail="Inquiry history queue is full", headers={"Retry-After": "5"})
+    try:
+        replayed = await deduplicator.replay(request)
+    except InquiryConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+
+    async def events():
+        processing_id = str(uuid.uuid4())
+        result = replayed
+        if result is None:
+            try:
+                # Check again: a duplicate may have started before the stream did
+                result = await deduplicator.replay(request)
+            except InquiryConflict as e:
+                yield _sse("error", {"detail": str(e)})
+                return
+        if result is None:
+            future = deduplicator.begin(request)
+            try:
+                async for item in astream_inquiry(request):
+                    if item["event"] == "result":
+                        result = item["data"]
+                    else:
+                        yield _sse(item["event"], item["data"])
+            except BaseException as e:
+                # Includes the client disconnecting mid-stream
+                deduplicator.fail(request, future, e)
+                raise
+            deduplicator.complete(request, future, result)
+            try:
+                await run_in_threadpool(history_writer.submit, [history_entry(request, result)])
+            except HistoryBackpressure as e:
+                logger.error(f"Streamed inquiry from {request.email} was not saved: {e}")
+                deduplicator.forget(request)
+                yield _sse("error", {"detail": str(e)})
+
+        result = {**result, "processing_id": processing_id, "processed_at": datetime.utcnow().isoformat()}
+        yield _sse("result", InquiryResponse(**result))
+
+    # X-Accel-Buffering stops nginx-style proxies from holding events back
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
 
 @router.post("/process/batch", response_model=BatchJobResponse)
 async def process_batch_inquiries_endpoint(
     file: UploadFile = File(...),
-    background_tasks: BackgroundTasks = BackgroundTasks(),
-    db: Session = Depends(get_db)
+    background_tasks: BackgroundTasks = BackgroundTasks()
 ):
     """
-    Process multiple inquiries via file upload (CSV or JSON) and return a job ID.
+    Process multiple inquiries via file upload (CSV, JSON array or NDJSON) and return a job ID.
+
+    The upload is parsed and validated in chunks while earlier rows are already
+    being processed; rows that fail validation are listed, with reasons, at
+    /process/batch/{job_id}/rejected.
     """
+    job_id, upload_path = None, None
     try:
-        filename = file.filename.lower()
+        fmt = upload_format(file.filename)
+        if fmt is None:
+            raise HTTPException(status_code=400, detail="Unsupported file type. Use .csv, .json or .ndjson")
 
-        if filename.endswith(".csv"):
-            contents = await file.read()
-            df = pd.read_csv(io.StringIO(contents.decode("utf-8")))
-            inquiries = df.to_dict(orient="records")
+        job_id = await run_in_threadpool(job_store.create_job, 0)
 
-        elif filename.endswith(".json"):
-            contents = await file.read()
-            inquiries = json.loads(contents)
+        # Spool the upload to disk so it is parsed incrementally, never held in memory
+        os.makedirs(config.INGEST_UPLOAD_DIR, exist_ok=True)
+        upload_path = os.path.join(config.INGEST_UPLOAD_DIR, f"{job_id}.{fmt}")
+        async with aiofiles.open(upload_path, "wb") as spool:
+            while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+                await spool.write(chunk)
 
-        else:
-            raise HTTPException(status_code=400, detail="Unsupported file type. Use .csv or .json")
-
-        inquiry_objs = []
-        for item in inquiries:
-            try:
-                inquiry_objs.append(InquiryRequest(**item))
-            except Exception:
-                continue  # Skip malformed records
-
-        if not inquiry_objs:
-            raise HTTPException(status_code=400, detail="No valid inquiries found in file")
-
-        job_id = str(uuid.uuid4())
-        job_progress[job_id] = {
-            "progress": 0,
-            "total": len(inquiry_objs),
-            "status": "in_progress",
-            "results": []
-        }
-
-        def process_with_progress():
-            results = []
-            for idx, inquiry in enumerate(inquiry_objs):
-                try:
-                    result = process_batch_inquiries([inquiry])[0]
-                    results.append(result)
-                except Exception as e:
-                    logger.error(f"Failed to process inquiry: {e}")
-                job_progress[job_id]["progress"] = idx + 1
-                job_progress[job_id]["results"] = results
-            job_progress[job_id]["status"] = "completed"
-            background_tasks.add_task(save_batch_inquiries_to_db, inquiries=inquiry_objs, results=results, db_session=db)
-
-        background_tasks.add_task(process_with_progress)
+        background_tasks.add_task(run_batch_upload, job_id, upload_path, fmt)
 
         return BatchJobResponse(job_id=job_id)
 
+    except HTTPException:
+        raise
     except Exception as e:
         logger.exception("Failed to process batch inquiries")
+        # The job never reached the pipeline; don't leave it in progress forever
+        if job_id is not None:
+            await run_in_threadpool(job_store.finish_job, job_id, "failed")
+        if upload_path is not None and os.path.exists(upload_path):
+            os.remove(upload_path)
         raise HTTPException(status_code=500, detail=f"Error: {e}")
 
 
+def _job_metadata(job) -> JobMetadata:
+    return JobMetadata(
+        job_id=job.id,
+        progress=job.progress,
+        total=job.total,
+        status=job.status,
+        succeeded=job.succeeded,
+        failed=job.failed,
+        rejected=job.rejected,
+        created_at=job.created_at,
+        completed_at=job.completed_at
+    )
+
+
 @router.get("/process/batch/jobs", response_model=List[JobMetadata])
-def list_all_batch_jobs_with_metadata():
+def list_all_batch_jobs_with_metadata(
+    limit: int = Query(100, ge=1, le=1000, description="Number of most recent jobs to return")
+):
     """
-    Returns metadata for all batch jobs.
+    Returns metadata for the most recent batch jobs.
     """
-    return [
-        JobMetadata(
-            job_id=job_id,
-            progress=data["progress"],
-            total=data["total"],
-            status=data["status"]
-        )
-        for job_id, data in job_progress.items()
-    ]
+    return [_job_metadata(job) for job in job_store.list_jobs(limit)]
+
 
-@router.get("/process/batch/{job_id}/progress")
+@router.get("/process/batch/{job_id}/progress", response_model=JobMetadata)
 def get_batch_progress(job_id: str):
     """
-    Retrieve progress for a given batch job
+    Retrieve progress counters for a given batch job
+    """
+    job = job_store.get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job ID not found")
+    return _job_metadata(job)
+
+
+@router.get("/process/batch/{job_id}/results", response_model=BatchJobResultsPage)
+def get_batch_results(
+    job_id: str,
+    cursor: Optional[int] = Query(None, ge=0, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of results to return")
+):
+    """
+    Page through the results of a batch job in file order
+    """
+    if not job_store.get_job(job_id):
+        raise HTTPException(status_code=404, detail="Job ID not found")
+
+    rows = job_store.get_results(job_id, after=cursor - 1 if cursor is not None else -1, limit=limit)
+    return BatchJobResultsPage(
+        job_id=job_id,
+        results=[
+            BatchJobResultItem(
+                index=row.item_index,
+                email=row.email,
+                category=row.category,
+                response=row.response,
+                status=row.status,
+                error=row.error
+            ) for row in rows
+        ],
+        next_cursor=rows[-1].item_index + 1 if len(rows) == limit else None
+    )
+
+
+@router.get("/process/batch/{job_id}/rejected")
+def get_batch_rejected_rows(job_id: str):
+    """
+    Download the CSV report of upload rows rejected by validation
     """
-    if job_id not in job_progress:
+    report_path = job_store.rejected_report_path(job_id)
+    if not job_store.get_job(job_id) or not os.path.exists(report_path):
         raise HTTPException(status_code=404, detail="Job ID not found")
-    return job_progress[job_id]
+    return FileResponse(report_path, media_type="text/csv", filename=f"{job_id}-rejected.csv")
+
+
+@router.get("/cache/stats")
+def get_cache_stats():
+    """
+    Hit rates and latency saved by the response, retrieval and embedding caches,
+    plus idempotent replays of repeated inquiry IDs
+    """
+    embedding_stats = getattr(retrieval.get_embeddings(), "stats", None)
+    return {
+        "response_cache": response_cache.stats(),
+        "retrieval_cache": retrieval.retrieval_cache.stats(),
+        "embedding_cache": embedding_stats() if embedding_stats else None,
+        "idempotency": deduplicator.stats()
+    }
 
 
 # Inquiry history and tracking endpoints
+def _encode_history_cursor(row: InquiryHistory) -> str:
+    payload = json.dumps({"created_at": row.created_at.isoformat(), "id": row.id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def _decode_history_cursor(cursor: str):
+    try:
+        payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        return datetime.fromisoformat(payload["created_at"]), int(payload["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _filtered_history(db: Session, email, category, date_from, date_to):
+    query = db.query(InquiryHistory)
+    
+    if email:
+        query = query.filter(InquiryHistory.email == email)
+    
+    if category:
+        query = query.filter(InquiryHistory.category == category)
+    
+    if date_from:
+        query = query.filter(InquiryHistory.created_at >= date_from)
+    
+    if date_to:
+        query = query.filter(InquiryHistory.created_at <= date_to)
+    
+    return query
+
+
+def _history_item(row: InquiryHistory) -> InquiryHistoryResponse:
+    return InquiryHistoryResponse(
+        id=row.id,
+        email=row.email,
+        category=row.category,
+        message=row.message,
+        response=row.response,
+        # email_title=row.email_title,
+        # email_body=row.email_body,
+        listing_id=row.listing_id,
+        created_at=row.created_at
+    )
+
+
 @router.get("/history", response_model=List[InquiryHistoryResponse])
 async def get_inquiry_history(
     skip: int = Query(0, ge=0, description="Number of records to skip"),
@@ -175,41 +350,62 @@ async def get_inquiry_history(
     db: Session = Depends(get_db)
 ):
     """
-    Get inquiry history with advanced filtering options
+    Get inquiry history with advanced filtering options, newest first.
+
+    Deep pages get slower with skip; /history/page pages with a cursor instead.
     """
     try:
-        # Build query with filters
-        query = db.query(InquiryHistory)
+        query = _filtered_history(db, email, category, date_from, date_to)
         
-        if email:
-            query = query.filter(InquiryHistory.email == email)
+        # Apply pagination and ordering
+        rows = query.order_by(
+            desc(InquiryHistory.created_at), desc(InquiryHistory.id)
+        ).offset(skip).limit(limit).all()
         
-        if category:
-            query = query.filter(InquiryHistory.category == category)
+        return [_history_item(row) for row in rows]
         
-        if date_from:
-            query = query.filter(InquiryHistory.created_at >= date_from)
+    except Exception as e:
+        logger.error(f"Error fetching inquiry history: {e}")
+        raise HTTPException(status_code=500, detail="Internal server error")
+
+
+@router.get("/history/page", response_model=InquiryHistoryPage)
+async def get_inquiry_history_page(
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    limit: int = Query(100, ge=1, le=1000, description="Number of records to return"),
+    email: Optional[str] = Query(None, description="Filter by email address"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    date_from: Optional[datetime] = Query(None, description="Filter from date"),
+    date_to: Optional[datetime] = Query(None, description="Filter to date"),
+    db: Session = Depends(get_db)
+):
+    """
+    Inquiry history with the same filters as /history, keyset-paginated on
+    (created_at, id): pass the returned next_cursor to fetch the following page.
+    """
+    try:
+        query = _filtered_history(db, email, category, date_from, date_to)
         
-        if date_to:
-            query = query.filter(InquiryHistory.created_at <= date_to)
+        # Seek past the previous page instead of counting through it with OFFSET
+        if cursor:
+            cursor_created_at, cursor_id = _decode_history_cursor(cursor)
+            query = query.filter(
+                tuple_(InquiryHistory.created_at, InquiryHistory.id) < tuple_(cursor_created_at, cursor_id)
+            )
         
-        # Apply pagination and ordering
-        rows = query.order_by(desc(InquiryHistory.created_at)).offset(skip).limit(limit).all()
+        rows = query.order_by(
+            desc(InquiryHistory.created_at), desc(InquiryHistory.id)
+        ).limit(limit + 1).all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        return [
-            InquiryHistoryResponse(
-                id=row.id,
-                email=row.email,
-                category=row.category,
-                message=row.message,
-                response=row.response,
-                # email_title=row.email_title,
-                # email_body=row.email_body,
-                listing_id=row.listing_id,
-                created_at=row.created_at
-            ) for row in rows
-        ]
+        return InquiryHistoryPage(
+            items=[_history_item(row) for row in rows],
+            next_cursor=_encode_history_cursor(rows[-1]) if has_more else None
+        )
         
+    except HTTPException:
+        raise
     except Exception as e:
         logger.error(f"Error fetching inquiry history: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
@@ -258,47 +454,10 @@ async def get_inquiry_analytics(
     Get analytics and insights about inquiry patterns
     """
     try:
-        end_date = datetime.utcnow()
-        start_date = end_date - timedelta(days=days)
-        
-        # Get basic statistics
-        total_inquiries = db.query(InquiryHistory).filter(
-            InquiryHistory.created_at >= start_date
-        ).count()
-        
-        # Category distribution
-        category_stats = db.query(
-            InquiryHistory.category,
-            func.count(InquiryHistory.id).label('count')
-        ).filter(
-            InquiryHistory.created_at >= start_date
-        ).group_by(InquiryHistory.category).all()
-        
-        # Daily inquiry counts
-        daily_stats = db.query(
-            func.date(InquiryHistory.created_at).label('date'),
-            func.count(InquiryHistory.id).label('count')
-        ).filter(
-            InquiryHistory.created_at >= start_date
-        ).group_by(func.date(InquiryHistory.created_at)).all()
+        # Served from the daily rollups maintained on save, not a scan of inquiry_history
+        analytics = get_analytics(db, days)
         
-        # Top inquiring emails
-        top_users = db.query(
-            InquiryHistory.email,
-            func.count(InquiryHistory.id).label('count')
-        ).filter(
-            InquiryHistory.created_at >= start_date
-        ).group_by(InquiryHistory.email).order_by(
-            desc(func.count(InquiryHistory.id))
-        ).limit(10).all()
-        
-        return InquiryAnalyticsResponse(
-            total_inquiries=total_inquiries,
-            date_range_days=days,
-            category_distribution={cat: count for cat, count in category_stats},
-            daily_counts={str(date): count for date, count in daily_stats},
-            top_users=[{"email": email, "count": count} for email, count in top_users]
-        )
+        return InquiryAnalyticsResponse(date_range_days=days, **analytics)
         
     except Exception as e:
         logger.error(f"Error generating analytics: {e}")
@@ -307,84 +466,38 @@ async def get_inquiry_analytics(
 
 # Status and health check endpoints
 @router.get("/status", response_model=InquiryStatusResponse)
-async def get_processing_status(db: Session = Depends(get_db)):
+async def get_processing_status():
     """
-    Get current system status and processing capabilities
+    Get current system status from the background health prober's latest snapshot
     """
-    try:
-        # Check database connectivity
-        db_status = "healthy"
-        try:
-            db.execute("SELECT 1")
-        except:
-            db_status = "unhealthy"
-        
-        # Check vector store connectivity
-        vectorstore_status = "healthy"
-        try:
-            retriever = get_retriever()
-            # Try a simple retrieval test
-            retriever.get_relevant_documents("test")
-        except:
-            vectorstore_status = "unhealthy"
-        
-        # Get recent processing stats
-        recent_inquiries = db.query(InquiryHistory).filter(
-            InquiryHistory.created_at >= datetime.utcnow() - timedelta(hours=1)
-        ).count()
-        
-        return InquiryStatusResponse(
-            status="healthy" if db_status == "healthy" and vectorstore_status == "healthy" else "degraded",
-            database_status=db_status,
-            vectorstore_status=vectorstore_status,
-            recent_inquiries_count=recent_inquiries,
-            last_check=datetime.utcnow().isoformat()
-        )
-        
-    except Exception as e:
-        logger.error(f"Error checking system status: {e}")
-        return InquiryStatusResponse(
-            status="unhealthy",
-            database_status="unknown",
-            vectorstore_status="unknown",
-            recent_inquiries_count=0,
-            last_check=datetime.utcnow().isoformat(),
-            error_message=str(e)
-        )
+    snapshot = health_prober.snapshot()
+    dependencies = snapshot["dependencies"]
+    return InquiryStatusResponse(
+        status=snapshot["status"],
+        database_status=dependencies.get("database", {}).get("status", "unknown"),
+        vectorstore_status=dependencies.get("vectorstore", {}).get("status", "unknown"),
+        recent_inquiries_count=snapshot["recent_inquiries_count"],
+        last_check=snapshot["last_check"],
+        dependencies=dependencies
+    )
 
 
 # Search and filtering endpoints
 @router.get("/search", response_model=List[InquiryHistoryResponse])
 async def search_inquiries(
     query: str = Query(..., description="Search query"),
-    search_in: str = Query("message", description="Field to search in: message, response, email"),
+    search_in: str = Query("message", description="Field to search in: message, response, email, or all"),
     limit: int = Query(50, ge=1, le=500),
     db: Session = Depends(get_db)
 ):
     """
-    Search through inquiry history using text search
+    Search through inquiry history. Words are ANDed, "quoted phrases" match
+    exactly and a trailing * matches a prefix.
     """
     try:
-        # Build search query based on field
-        if search_in == "message":
-            results = db.query(InquiryHistory).filter(
-                InquiryHistory.message.contains(query)
-            ).limit(limit).all()
-        elif search_in == "response":
-            results = db.query(InquiryHistory).filter(
-                InquiryHistory.response.contains(query)
-            ).limit(limit).all()
-        elif search_in == "email":
-            results = db.query(InquiryHistory).filter(
-                InquiryHistory.email.contains(query)
-            ).limit(limit).all()
-        else:
-            # Search in all fields
-            results = db.query(InquiryHistory).filter(
-                InquiryHistory.message.contains(query) |
-                InquiryHistory.response.contains(query) |
-                InquiryHistory.email.contains(query)
-            ).limit(limit).all()
+        # Full-text index (FTS5 / tsvector), ranked by relevance
+        field = search_in if search_in in SEARCH_FIELDS else None
+        results = search_history(db, query, field=field, limit=limit)
         
         return [
             InquiryHistoryResponse(
@@ -403,48 +516,3 @@ async def search_inquiries(
     except Exception as e:
         logger.error(f"Error searching inquiries: {e}")
         raise HTTPException(status_code=500, detail="Internal server error")
-
-
-# Helper functions for background tasks
-async def save_inquiry_to_db(request: InquiryRequest, result: Dict[str, Any], db_session: Session):
-    """Save single inquiry to database"""
-    try:
-        record = InquiryHistory(
-            email=request.email,
-            category=result['category'],
-            message=request.message,
-            response=result['response'],
-            email_title=result.get('email_title'),
-            email_body=result.get('email_body'),
-            listing_id=request.listing_id
-        )
-        db_session.add(record)
-        db_session.commit()
-        logger.info(f"Inquiry saved to database for {request.email}")
-    except Exception as e:
-        logger.error(f"Failed to save inquiry to database: {e}")
-        db_session.rollback()
-
-
-async def save_batch_inquiries_to_db(inquiries: List[InquiryRequest], results: List[Dict[str, Any]], db_session: Session):
-    """Save batch inquiries to database"""
-    try:
-        records = []
-        for inquiry, result in zip(inquiries, results):
-            record = InquiryHistory(
-                email=inquiry.email,
-                category=result['category'],
-                message=inquiry.message,
-                response=result['response'],
-                email_title=result.get('email_title'),
-                email_body=result.get('email_body'),
-                listing_id=inquiry.listing_id
-            )
-            records.append(record)
-        
-        db_session.bulk_save_objects(records)
-        db_session.commit()
-        logger.info(f"Batch of {len(records)} inquiries saved to database")
-    except Exception as e:
-        logger.error(f"Failed to save batch inquiries to database: {e}")
-        db_session.rollback()
\ No newline at end of file
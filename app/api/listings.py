@@ -0,0 +1,67 @@
+from fastapi import APIRouter, HTTPException, Query
+from typing import Optional
+from app.core.listing_store import get_listing_table, NUMERIC_COLUMNS
+import logging
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+
+def _require_table():
+    table = get_listing_table()
+    if table is None:
+        raise HTTPException(status_code=503, detail="No listings ingested yet")
+    return table
+
+
+@router.get("/query")
+def query_listings(
+    city: Optional[str] = Query(None, description="Exact city name (case-insensitive)"),
+    state: Optional[str] = Query(None, description="Exact state/province (case-insensitive)"),
+    min_price: Optional[float] = Query(None, ge=0),
+    max_price: Optional[float] = Query(None, ge=0),
+    min_bedrooms: Optional[float] = Query(None, ge=0),
+    max_bedrooms: Optional[float] = Query(None, ge=0),
+    min_bathrooms: Optional[float] = Query(None, ge=0),
+    max_bathrooms: Optional[float] = Query(None, ge=0),
+    min_square_footage: Optional[float] = Query(None, ge=0),
+    max_square_footage: Optional[float] = Query(None, ge=0),
+    sort_by: Optional[str] = Query(None, description="price, bedrooms, bathrooms or square_footage"),
+    descending: bool = Query(False),
+    limit: int = Query(50, ge=0, le=1000, description="Number of listings to return (0 for counts only)")
+):
+    """
+    Exact attribute query over the in-memory listing table
+    """
+    if sort_by is not None and sort_by not in NUMERIC_COLUMNS:
+        raise HTTPException(status_code=400, detail=f"Cannot sort by {sort_by}")
+
+    table = _require_table()
+    rows = table.filter(
+        city=city,
+        state=state,
+        min_price=min_price,
+        max_price=max_price,
+        min_bedrooms=min_bedrooms,
+        max_bedrooms=max_bedrooms,
+        min_bathrooms=min_bathrooms,
+        max_bathrooms=max_bathrooms,
+        min_square_footage=min_square_footage,
+        max_square_footage=max_square_footage
+    )
+    return {
+        **table.stats(rows),
+        "results": table.rows(rows, sort_by=sort_by, descending=descending, limit=limit)
+    }
+
+
+@router.get("/{listing_id}")
+def get_listing(listing_id: str):
+    """
+    Look up a single listing by its Listing ID
+    """
+    table = _require_table()
+    rows = table.filter(listing_id=listing_id)
+    if not len(rows):
+        raise HTTPException(status_code=404, detail="Listing not found")
+    return table.row(int(rows[0]))
@@ -14,11 +14,25 @@ class Config:
     
     # Vector Store
     CHROMA_DIR: str = os.getenv("CHROMA_DB", "chroma_db")
+    EMBEDDING_CACHE_ENABLED: bool = os.getenv("EMBEDDING_CACHE_ENABLED", "true").lower() == "true"
+    EMBEDDING_CACHE_SIZE: int = int(os.getenv("EMBEDDING_CACHE_SIZE", "10000"))
     
+    # Ingestion
+    INGEST_UPLOAD_DIR: str = os.getenv("INGEST_UPLOAD_DIR", "data/uploads")
+    INGEST_BATCH_ROWS: int = int(os.getenv("INGEST_BATCH_ROWS", "1000"))
+    INGEST_QUEUE_DEPTH: int = int(os.getenv("INGEST_QUEUE_DEPTH", "2"))
+    INGEST_JOB_TTL_HOURS: float = float(os.getenv("INGEST_JOB_TTL_HOURS", "24"))
+
     # OpenAI
     OPENAI_API_KEY: Optional[str] = os.getenv("OPENAI_API_KEY")
     OPENAI_MODEL: str = os.getenv("OPENAI_MODEL", "gpt-4-turbo-preview")
     EMBEDDING_MODEL: str = os.getenv("EMBEDDING_MODEL", "text-embedding-ada-002")
+    OPENAI_RPM_LIMIT: float = float(os.getenv("OPENAI_RPM_LIMIT", "500"))
+    OPENAI_TPM_LIMIT: float = float(os.getenv("OPENAI_TPM_LIMIT", "150000"))
+    OPENAI_COMPLETION_TOKENS_ESTIMATE: int = int(os.getenv("OPENAI_COMPLETION_TOKENS_ESTIMATE", "400"))
+    OPENAI_MAX_RETRIES: int = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+    OPENAI_RETRY_BASE_DELAY: float = float(os.getenv("OPENAI_RETRY_BASE_DELAY", "1.0"))
+    OPENAI_RETRY_MAX_DELAY: float = float(os.getenv("OPENAI_RETRY_MAX_DELAY", "30"))
     
     # Email / SMTP
     EMAIL_ENABLED: bool = os.getenv("EMAIL_ENABLED", "true").lower() == "true"
@@ -28,10 +42,50 @@ class Config:
     SMTP_PASSWORD: Optional[str] = os.getenv("SMTP_PASSWORD")
     EMAIL_FROM_NAME: str = os.getenv("EMAIL_FROM_NAME", "Real Estate Assistant")
     EMAIL_FROM_ADDRESS: Optional[str] = os.getenv("EMAIL_FROM_ADDRESS", SMTP_USERNAME)
+    SMTP_STARTTLS: bool = os.getenv("SMTP_STARTTLS", "true").lower() == "true"
+    SMTP_POOL_SIZE: int = int(os.getenv("SMTP_POOL_SIZE", "4"))
+    SMTP_TIMEOUT: float = float(os.getenv("SMTP_TIMEOUT", "30"))
+    OUTBOX_CONCURRENCY: int = int(os.getenv("OUTBOX_CONCURRENCY", "4"))
+    OUTBOX_BATCH_SIZE: int = int(os.getenv("OUTBOX_BATCH_SIZE", "50"))
+    OUTBOX_POLL_INTERVAL: float = float(os.getenv("OUTBOX_POLL_INTERVAL", "2"))
+    OUTBOX_MAX_ATTEMPTS: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "6"))
+    OUTBOX_RETRY_BASE_DELAY: float = float(os.getenv("OUTBOX_RETRY_BASE_DELAY", "30"))
+    OUTBOX_RETRY_MAX_DELAY: float = float(os.getenv("OUTBOX_RETRY_MAX_DELAY", "3600"))
+    OUTBOX_CLAIM_LEASE: float = float(os.getenv("OUTBOX_CLAIM_LEASE", "600"))  # Seconds before a 'sending' claim is presumed dead
 
     # Application
     MAX_RETRIEVAL_DOCS: int = int(os.getenv("MAX_RETRIEVAL_DOCS", "5"))
+    MIN_FILTERED_RESULTS: int = int(os.getenv("MIN_FILTERED_RESULTS", "3"))
+    RETRIEVAL_MODE: str = os.getenv("RETRIEVAL_MODE", "hybrid")  # dense, lexical or hybrid
+    LEXICAL_MAX_DF: float = float(os.getenv("LEXICAL_MAX_DF", "0.5"))  # Skip BM25 terms in more than this share of chunks
+    RETRIEVAL_CACHE_SIZE: int = int(os.getenv("RETRIEVAL_CACHE_SIZE", "10000"))
+    RETRIEVAL_CACHE_TTL: float = float(os.getenv("RETRIEVAL_CACHE_TTL", "3600"))
     LLM_TEMPERATURE: float = float(os.getenv("LLM_TEMPERATURE", "0.3"))
+    CLASSIFIER_ENABLED: bool = os.getenv("CLASSIFIER_ENABLED", "true").lower() == "true"
+    CLASSIFIER_PATH: str = os.getenv("CLASSIFIER_PATH", os.path.join(CHROMA_DIR, "inquiry_classifier.json"))
+    CLASSIFIER_CONFIDENCE_THRESHOLD: float = float(os.getenv("CLASSIFIER_CONFIDENCE_THRESHOLD", "0.35"))
+    CLASSIFIER_MIN_SIMILARITY: float = float(os.getenv("CLASSIFIER_MIN_SIMILARITY", "0.25"))  # Cosine to the best centroid
+    MAX_CONCURRENT_INQUIRIES: int = int(os.getenv("MAX_CONCURRENT_INQUIRIES", "50"))
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "10"))
+    BATCH_ITEM_TIMEOUT: float = float(os.getenv("BATCH_ITEM_TIMEOUT", "120"))
+    BATCH_JOB_TTL_HOURS: float = float(os.getenv("BATCH_JOB_TTL_HOURS", "24"))
+    BATCH_UPLOAD_CHUNK_ROWS: int = int(os.getenv("BATCH_UPLOAD_CHUNK_ROWS", "500"))
+    IDEMPOTENCY_CACHE_SIZE: int = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "5000"))
+    RESPONSE_CACHE_TTL: float = float(os.getenv("RESPONSE_CACHE_TTL", "3600"))
+    RESPONSE_CACHE_THRESHOLD: float = float(os.getenv("RESPONSE_CACHE_THRESHOLD", "0.95"))
+    STARTUP_PROFILE: bool = os.getenv("STARTUP_PROFILE", "false").lower() == "true"
+    STARTUP_BUDGET_SECONDS: float = float(os.getenv("STARTUP_BUDGET_SECONDS", "5"))
+    HEALTH_PROBE_INTERVAL: float = float(os.getenv("HEALTH_PROBE_INTERVAL", "30"))
+    HEALTH_LLM_PROBE_INTERVAL: float = float(os.getenv("HEALTH_LLM_PROBE_INTERVAL", "300"))
+    HEALTH_PROBE_TIMEOUT: float = float(os.getenv("HEALTH_PROBE_TIMEOUT", "5"))
+    FULLTEXT_SEARCH_ENABLED: bool = os.getenv("FULLTEXT_SEARCH_ENABLED", "true").lower() == "true"
+    FULLTEXT_LANGUAGE: str = os.getenv("FULLTEXT_LANGUAGE", "english")
+    HISTORY_QUEUE_SIZE: int = int(os.getenv("HISTORY_QUEUE_SIZE", "10000"))
+    HISTORY_FLUSH_SIZE: int = int(os.getenv("HISTORY_FLUSH_SIZE", "500"))
+    HISTORY_FLUSH_INTERVAL: float = float(os.getenv("HISTORY_FLUSH_INTERVAL", "1.0"))
+    HISTORY_ENQUEUE_TIMEOUT: float = float(os.getenv("HISTORY_ENQUEUE_TIMEOUT", "2.0"))
     
     def validate(self):
         """Validate required configuration"""
@@ -52,5 +106,4 @@ class Config:
         logger.info("Configuration validated successfully")
 
 
-config = Config()
-config.validate()
\ No newline at end of file
+config = Config()
\ No newline at end of file
@@ -0,0 +1,255 @@
+"""
+Local inquiry classifier.
+
+A TF-IDF nearest-centroid model over word unigrams and bigrams that picks one of
+the fixed inquiry categories in-process. Messages it is not confident about are
+left to the LLM category chain.
+
+Retrain from the inquiry_history table with:
+    python -m app.core.classifier
+"""
+
+from collections import Counter, defaultdict
+from typing import Dict, Iterable, List, Optional, Tuple
+from app.config import config
+import json
+import math
+import os
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+CATEGORIES = [
+    "Price Inquiry",
+    "Availability Check",
+    "Schedule Visit",
+    "Neighborhood Info",
+    "Financing Question",
+    "General Inquiry",
+]
+
+DEFAULT_CATEGORY = "General Inquiry"
+
+# Seed examples so the model is usable before any history exists
+SEED_EXAMPLES = {
+    "Price Inquiry": [
+        "What is the price of this property?",
+        "How much does this house cost?",
+        "Is the asking price negotiable?",
+        "What's the listing price?",
+        "Has there been any price reduction?",
+        "What is the price per square foot?",
+    ],
+    "Availability Check": [
+        "Is this property still available?",
+        "Is the house still on the market?",
+        "Has this listing been sold already?",
+        "When will the apartment be available for move in?",
+        "Is the unit available now?",
+        "Are there other offers pending on it?",
+    ],
+    "Schedule Visit": [
+        "Can I schedule a viewing?",
+        "I would like to tour the property this weekend.",
+        "Can we book a showing tomorrow?",
+        "When is the next open house?",
+        "I'd like to visit and see the house in person.",
+        "What times are available for a walkthrough?",
+    ],
+    "Neighborhood Info": [
+        "What is the neighborhood like?",
+        "Are there good schools nearby?",
+        "Is the area safe?",
+        "How is public transportation around there?",
+        "Are there shops and restaurants close by?",
+        "What is the commute to downtown like?",
+    ],
+    "Financing Question": [
+        "What mortgage options are available?",
+        "How much is the down payment?",
+        "Do you accept FHA or VA loans?",
+        "What would the monthly payment be?",
+        "Do I need a mortgage pre-approval?",
+        "What interest rate and financing can I get?",
+    ],
+    "General Inquiry": [
+        "I have a question about this property.",
+        "Can you send me more information?",
+        "Please tell me more about this listing.",
+        "Could someone contact me with details?",
+        "I am interested, what else should I know?",
+        "Does the property allow pets?",
+    ],
+}
+
+_TOKEN_RE = re.compile(r"[a-z0-9']+")
+
+# Function words that carry no category signal. Question words like "how",
+# "much", "when" and "where" are kept because they separate price, visit and
+# neighborhood questions.
+STOP_WORDS = frozenset("""
+    a about am an and any are as at be been being but by can could do does did
+    for from had has have i i'd i'm i've if in into is it it's its me my of on
+    or our please so some that the their them there these they this those to
+    us was we were will with would you your
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased word unigrams plus bigrams, without stop words"""
+    words = [word for word in _TOKEN_RE.findall(text.lower()) if word not in STOP_WORDS]
+    return words + [f"{a} {b}" for a, b in zip(words, words[1:])]
+
+
+def normalize_category(text: str) -> str:
+    """Map free-text LLM output onto one of the fixed categories"""
+    cleaned = text.strip().strip('"').strip(".").lower()
+    for category in CATEGORIES:
+        if cleaned == category.lower():
+            return category
+    for category in CATEGORIES:
+        if category.lower() in cleaned:
+            return category
+    return DEFAULT_CATEGORY
+
+
+class InquiryClassifier:
+    """TF-IDF nearest-centroid classifier over a fixed label set"""
+
+    def __init__(self, idf: Dict[str, float], centroids: Dict[str, Dict[str, float]], trained_on: int = 0):
+        self.idf = idf
+        self.centroids = centroids
+        self.trained_on = trained_on
+
+    def _vectorize(self, text: str) -> Dict[str, float]:
+        counts = Counter(token for token in tokenize(text) if token in self.idf)
+        vector = {token: count * self.idf[token] for token, count in counts.items()}
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        return {token: value / norm for token, value in vector.items()} if norm else {}
+
+    @classmethod
+    def train(cls, examples: Iterable[Tuple[str, str]]) -> "InquiryClassifier":
+        """Fit IDF weights and per-category centroids from (message, category) pairs"""
+        examples = [(text, label) for text, label in examples if text and label in CATEGORIES]
+        document_frequency = Counter()
+        for text, _ in examples:
+            document_frequency.update(set(tokenize(text)))
+
+        total = len(examples)
+        idf = {token: math.log((1 + total) / (1 + df)) + 1 for token, df in document_frequency.items()}
+        model = cls(idf, {}, trained_on=total)
+
+        sums: Dict[str, Dict[str, float]] = defaultdict(lambda: defaultdict(float))
+        for text, label in examples:
+            for token, value in model._vectorize(text).items():
+                sums[label][token] += value
+
+        for label, vector in sums.items():
+            norm = math.sqrt(sum(value * value for value in vector.values()))
+            model.centroids[label] = {token: value / norm for token, value in vector.items()}
+
+        return model
+
+    def predict(self, text: str) -> Tuple[str, float, float]:
+        """
+        Return the best category, a confidence in [0, 1] measured as the
+        relative margin between the best and second-best centroid similarity,
+        and the best cosine similarity itself.
+        """
+        vector = self._vectorize(text)
+        if not vector:
+            return DEFAULT_CATEGORY, 0.0, 0.0
+
+        scores = sorted(
+            (
+                (sum(value * centroid.get(token, 0.0) for token, value in vector.items()), label)
+                for label, centroid in self.centroids.items()
+            ),
+            reverse=True
+        )
+        best_score, best_label = scores[0]
+        runner_up = scores[1][0] if len(scores) > 1 else 0.0
+        if best_score <= 0:
+            return DEFAULT_CATEGORY, 0.0, 0.0
+        return best_label, (best_score - runner_up) / best_score, best_score
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as f:
+            json.dump({"idf": self.idf, "centroids": self.centroids, "trained_on": self.trained_on}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "InquiryClassifier":
+        with open(path) as f:
+            data = json.load(f)
+        return cls(data["idf"], data["centroids"], data.get("trained_on", 0))
+
+
+def seed_examples() -> List[Tuple[str, str]]:
+    return [(text, label) for label, texts in SEED_EXAMPLES.items() for text in texts]
+
+
+_classifier: Optional[InquiryClassifier] = None
+_classifier_lock = threading.Lock()
+
+
+def get_classifier() -> InquiryClassifier:
+    """Load the persisted classifier, or fit one from the seed examples"""
+    global _classifier
+    if _classifier is None:
+        with _classifier_lock:
+            if _classifier is None:
+                if os.path.exists(config.CLASSIFIER_PATH):
+                    _classifier = InquiryClassifier.load(config.CLASSIFIER_PATH)
+                    logger.info(f"Loaded inquiry classifier trained on {_classifier.trained_on} examples")
+                else:
+                    _classifier = InquiryClassifier.train(seed_examples())
+                    logger.info("Using seed inquiry classifier")
+    return _classifier
+
+
+def classify_locally(message: str) -> Optional[str]:
+    """
+    Return a category if the local model is confident, otherwise None.
+
+    The message has to be close to a centroid in absolute terms as well as
+    clearly ahead of the runner-up; a large margin between two weak matches
+    is still a guess.
+    """
+    label, confidence, similarity = get_classifier().predict(message)
+    if similarity >= config.CLASSIFIER_MIN_SIMILARITY and confidence >= config.CLASSIFIER_CONFIDENCE_THRESHOLD:
+        logger.debug(f"Local classifier chose {label} ({confidence:.2f}, similarity {similarity:.2f})")
+        return label
+    return None
+
+
+def retrain_from_history(db) -> InquiryClassifier:
+    """Retrain the classifier from seed examples plus categorized inquiry history and persist it"""
+    global _classifier
+    from app.db.models import InquiryHistory
+
+    rows = db.query(InquiryHistory.message, InquiryHistory.category).filter(
+        InquiryHistory.category.in_(CATEGORIES),
+        InquiryHistory.message.isnot(None)
+    ).yield_per(1000)
+
+    model = InquiryClassifier.train(seed_examples() + [(message, category) for message, category in rows])
+    model.save(config.CLASSIFIER_PATH)
+    with _classifier_lock:
+        _classifier = model
+
+    logger.info(f"Inquiry classifier retrained on {model.trained_on} examples")
+    return model
+
+
+if __name__ == "__main__":
+    from app.db.session import SessionLocal
+
+    logging.basicConfig(level=logging.INFO)
+    session = SessionLocal()
+    try:
+        retrain_from_history(session)
+    finally:
+        session.close()
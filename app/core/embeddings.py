@@ -1,25 +1,163 @@
-from langchain_openai import OpenAIEmbeddings
+from langchain_core.embeddings import Embeddings
 from app.config import config
+from collections import OrderedDict
+from array import array
+from typing import List
+import hashlib
+import os
+import sqlite3
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
 
+class CachedEmbeddings(Embeddings):
+    """
+    Content-addressed cache in front of an embedding model.
+
+    Vectors are keyed by (model name, sha256 of text) and kept in an in-memory
+    LRU tier backed by a SQLite file, so unchanged texts never hit the API twice.
+    Both tiers hold float32 arrays; lists are only built when handing vectors
+    back to LangChain.
+    """
+
+    def __init__(self, underlying: Embeddings, model_name: str, cache_path: str, max_memory_items: int = 10000):
+        self.underlying = underlying
+        self.model_name = model_name
+        self.max_memory_items = max_memory_items
+        self.hits = 0
+        self.misses = 0
+        self._memory: "OrderedDict[str, array]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(cache_path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+        )
+        self._conn.commit()
+
+    def _key(self, text: str) -> str:
+        digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+        return f"{self.model_name}:{digest}"
+
+    def _remember(self, key: str, vector: array):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_items:
+            self._memory.popitem(last=False)
+
+    def _lookup(self, keys: List[str]) -> dict:
+        """Return cached float32 arrays for the given keys from memory, then disk"""
+        found = {}
+        with self._lock:
+            disk_keys = []
+            for key in keys:
+                if key in self._memory:
+                    self._memory.move_to_end(key)
+                    found[key] = self._memory[key]
+                else:
+                    disk_keys.append(key)
+
+            # SQLite caps bound parameters, so query in slices
+            for start in range(0, len(disk_keys), 500):
+                batch = disk_keys[start:start + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = self._conn.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                for key, blob in rows:
+                    vector = array("f", blob)
+                    found[key] = vector
+                    self._remember(key, vector)
+        return found
+
+    def _store(self, items: dict):
+        packed = {key: array("f", vector) for key, vector in items.items()}
+        with self._lock:
+            for key, vector in packed.items():
+                self._remember(key, vector)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                [(key, vector.tobytes()) for key, vector in packed.items()]
+            )
+            self._conn.commit()
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        keys = [self._key(text) for text in texts]
+        cached = {key: vector.tolist() for key, vector in self._lookup(list(dict.fromkeys(keys))).items()}
+
+        # Embed each distinct missing text once
+        missing = {}
+        for key, text in zip(keys, texts):
+            if key not in cached and key not in missing:
+                missing[key] = text
+
+        with self._lock:
+            self.hits += len(texts) - sum(1 for key in keys if key in missing)
+            self.misses += sum(1 for key in keys if key in missing)
+
+        if missing:
+            vectors = self.underlying.embed_documents(list(missing.values()))
+            fresh = dict(zip(missing.keys(), vectors))
+            self._store(fresh)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
+
+    def embed_query(self, text: str) -> List[float]:
+        key = self._key(text)
+        cached = self._lookup([key])
+        if key in cached:
+            with self._lock:
+                self.hits += 1
+            return cached[key].tolist()
+
+        with self._lock:
+            self.misses += 1
+        vector = self.underlying.embed_query(text)
+        self._store({key: vector})
+        return vector
+
+    def stats(self) -> dict:
+        """Return cache hit/miss counters"""
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "memory_items": len(self._memory),
+            }
+
+
 def get_embedding_model():
     """Get embedding model with enhanced configuration and error handling"""
     try:
+        from langchain_openai import OpenAIEmbeddings
+
         embedding_model = OpenAIEmbeddings(
             model=config.EMBEDDING_MODEL,
             api_key=config.OPENAI_API_KEY,
             # Add additional parameters for better performance
             chunk_size=1000,  # Number of documents to send in each request
-            max_retries=3,    # Number of retries for failed requests
+            max_retries=0,    # Retried by app.core.rate_limit callers instead
             request_timeout=30.0  # Timeout for requests
         )
         
         logger.info(f"Embedding model initialized: {config.EMBEDDING_MODEL}")
-        return embedding_model
+
+        if not config.EMBEDDING_CACHE_ENABLED:
+            return embedding_model
+
+        cache_path = os.path.join(config.CHROMA_DIR, "embedding_cache.sqlite3")
+        logger.info(f"Embedding cache enabled at {cache_path}")
+        return CachedEmbeddings(
+            embedding_model,
+            model_name=config.EMBEDDING_MODEL,
+            cache_path=cache_path,
+            max_memory_items=config.EMBEDDING_CACHE_SIZE
+        )
         
     except Exception as e:
         logger.error(f"Failed to initialize embedding model: {e}")
-        raise RuntimeError(f"Could not initialize embedding model: {e}")
\ No newline at end of file
+        raise RuntimeError(f"Could not initialize embedding model: {e}")
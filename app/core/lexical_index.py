@@ -0,0 +1,216 @@
+"""
+In-process BM25 inverted index over listing chunks.
+
+Kept in sync by ingestion and persisted next to CHROMA_DIR, it answers exact-token
+queries (ZIP codes, street names, listing IDs, amenity words) without an
+embedding call and is fused with dense results for hybrid retrieval. Only
+postings, lengths and metadata are kept; chunk text stays in the vectorstore,
+so search() returns document IDs.
+"""
+
+from collections import Counter, defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from langchain_core.documents import Document
+from app.config import config
+import json
+import math
+import os
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+(?:[-_][a-z0-9]+)*")
+
+STOPWORDS = {
+    "a", "an", "and", "are", "at", "be", "by", "for", "from", "has", "have", "i", "in",
+    "is", "it", "its", "me", "my", "of", "on", "or", "the", "this", "to", "with", "you",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercased tokens; hyphenated IDs like l-123 are kept whole and also split"""
+    tokens = []
+    for token in _TOKEN_RE.findall(text.lower()):
+        if token in STOPWORDS:
+            continue
+        tokens.append(token)
+        if "-" in token or "_" in token:
+            tokens.extend(part for part in re.split(r"[-_]", token) if part)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over chunks keyed by vectorstore document ID"""
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, Dict[str, int]] = defaultdict(dict)
+        self.lengths: Dict[str, int] = {}
+        self.metadata: Dict[str, dict] = {}
+        # Distinct tokens of each chunk, so it can be removed without its text
+        self.terms: Dict[str, List[str]] = {}
+        self.total_length = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self.lengths)
+
+    def _add_counts(self, document_id: str, counts: Dict[str, int], metadata: Optional[dict]):
+        for token, count in counts.items():
+            self.postings[token][document_id] = count
+        length = sum(counts.values())
+        self.lengths[document_id] = length
+        self.total_length += length
+        self.metadata[document_id] = metadata or {}
+        self.terms[document_id] = list(counts)
+
+    def add(self, document_id: str, text: str, metadata: Optional[dict] = None):
+        with self._lock:
+            if document_id in self.lengths:
+                self.remove(document_id)
+            self._add_counts(document_id, Counter(tokenize(text)), metadata)
+
+    def add_documents(self, ids: Iterable[str], documents: Iterable[Document]):
+        for document_id, document in zip(ids, documents):
+            self.add(document_id, document.page_content, document.metadata)
+
+    def remove(self, document_id: str):
+        with self._lock:
+            if document_id not in self.lengths:
+                return
+            for token in self.terms.pop(document_id):
+                postings = self.postings.get(token)
+                if postings is not None:
+                    postings.pop(document_id, None)
+                    if not postings:
+                        del self.postings[token]
+            del self.metadata[document_id]
+            self.total_length -= self.lengths.pop(document_id)
+
+    def remove_many(self, ids: Iterable[str]):
+        for document_id in ids:
+            self.remove(document_id)
+
+    def search(
+        self,
+        query: str,
+        k: int,
+        predicate: Optional[Callable[[dict], bool]] = None,
+        max_df: Optional[float] = None
+    ) -> List[Tuple[str, float]]:
+        """
+        Top-k (document ID, BM25 score) pairs, optionally restricted by a metadata
+        predicate. Terms found in more than max_df of all chunks add almost
+        nothing to the score but walk huge postings lists, so they are skipped
+        whenever the query has a rarer term to rank on.
+        """
+        max_df = config.LEXICAL_MAX_DF if max_df is None else max_df
+        with self._lock:
+            total = len(self.lengths)
+            if not total:
+                return []
+            average_length = self.total_length / total
+
+            matched = [(token, self.postings[token]) for token in set(tokenize(query)) if token in self.postings]
+            selective = [(token, postings) for token, postings in matched if len(postings) <= max_df * total]
+            if selective:
+                matched = selective
+
+            scores: Dict[str, float] = defaultdict(float)
+            for token, postings in matched:
+                idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+                for document_id, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[document_id] / average_length)
+                    scores[document_id] += idf * tf * (self.k1 + 1) / (tf + norm)
+
+            ranked = sorted(scores.items(), key=lambda item: item[1], reverse=True)
+            results = []
+            for document_id, score in ranked:
+                if predicate and not predicate(self.metadata[document_id]):
+                    continue
+                results.append((document_id, score))
+                if len(results) >= k:
+                    break
+            return results
+
+    def save(self, path: str):
+        with self._lock:
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({
+                    "k1": self.k1,
+                    "b": self.b,
+                    "postings": self.postings,
+                    "metadata": self.metadata,
+                }, f, default=str)
+            os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "BM25Index":
+        with open(path) as f:
+            data = json.load(f)
+        index = cls(k1=data["k1"], b=data["b"])
+        if "documents" in data:
+            # Older files stored chunk text; re-tokenize it once
+            for document_id, (text, metadata) in data["documents"].items():
+                index.add(document_id, text, metadata)
+            return index
+
+        counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for token, postings in data["postings"].items():
+            for document_id, tf in postings.items():
+                counts[document_id][token] = tf
+        for document_id, metadata in data["metadata"].items():
+            index._add_counts(document_id, counts.get(document_id, {}), metadata)
+        return index
+
+
+def reciprocal_rank_fusion(rankings: List[List[Document]], k: int = 60) -> List[Document]:
+    """Fuse ranked document lists; documents are identified by their content"""
+    scores: Dict[str, float] = defaultdict(float)
+    first_seen: Dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, document in enumerate(ranking):
+            scores[document.page_content] += 1.0 / (k + rank + 1)
+            first_seen.setdefault(document.page_content, document)
+    return [first_seen[key] for key in sorted(scores, key=scores.get, reverse=True)]
+
+
+_index: Optional[BM25Index] = None
+_index_lock = threading.Lock()
+
+
+def index_path() -> str:
+    return os.path.join(config.CHROMA_DIR, "bm25_index.json")
+
+
+def get_lexical_index(vectorstore=None) -> BM25Index:
+    """
+    Load the persisted index, or rebuild it from the vectorstore if there is none.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = index_path()
+                if os.path.exists(path):
+                    _index = BM25Index.load(path)
+                    logger.info(f"Loaded BM25 index with {len(_index)} chunks")
+                else:
+                    _index = BM25Index()
+                    if vectorstore is not None:
+                        stored = vectorstore.get(include=["documents", "metadatas"])
+                        for document_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"]):
+                            _index.add(document_id, text, metadata)
+                        _index.save(path)
+                        logger.info(f"Built BM25 index with {len(_index)} chunks from the vectorstore")
+    return _index
+
+
+def save_lexical_index():
+    if _index is not None:
+        _index.save(index_path())
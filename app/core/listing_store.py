@@ -0,0 +1,311 @@
+"""
+Columnar in-memory listing table.
+
+Listing attributes are kept as NumPy columns (city and state dictionary-encoded)
+with sorted indexes on the numeric columns and hash indexes on city and listing
+ID, so exact attribute lookups and counts take microseconds and need neither an
+embedding nor an LLM call. The table is rebuilt at ingest time and persisted to
+CHROMA_DIR as an .npz file.
+"""
+
+from typing import Any, Dict, List, Optional
+from langchain_core.documents import Document
+from app.config import config
+from app.core.query_filters import extract_constraints
+import numpy as np
+import pandas as pd
+import os
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+TEXT_COLUMNS = {
+    "listing_id": "Listing ID",
+    "title": "Title",
+    "address": "Address",
+    "zip": "ZIP/Postal Code",
+    "amenities": "Amenities",
+}
+CATEGORICAL_COLUMNS = {
+    "city": "City",
+    "state": "State/Province",
+}
+NUMERIC_COLUMNS = {
+    "price": "Price",
+    "bedrooms": "Bedrooms",
+    "bathrooms": "Bathrooms",
+    "square_footage": "Square Footage",
+}
+
+# CSV columns the table is built from
+SOURCE_COLUMNS = [*TEXT_COLUMNS.values(), *CATEGORICAL_COLUMNS.values(), *NUMERIC_COLUMNS.values()]
+
+_COUNT_QUESTION_RE = re.compile(r"\b(how many|number of|count)\b", re.IGNORECASE)
+_ID_TOKEN_RE = re.compile(r"[A-Za-z0-9][A-Za-z0-9_-]*")
+
+
+def _clean_text(series: pd.Series) -> np.ndarray:
+    return series.fillna("").astype(str).str.strip().to_numpy(dtype=str)
+
+
+def _clean_number(series: pd.Series) -> np.ndarray:
+    cleaned = series.astype(str).str.replace(r"[$,\s]", "", regex=True)
+    return pd.to_numeric(cleaned, errors="coerce").to_numpy(dtype=np.float64)
+
+
+def _frame_columns(df: pd.DataFrame) -> Dict[str, np.ndarray]:
+    """Table columns for the listing rows in a DataFrame"""
+    df = df[df.notna().any(axis=1)]
+    columns: Dict[str, np.ndarray] = {}
+    for name, source in TEXT_COLUMNS.items():
+        columns[name] = _clean_text(df[source]) if source in df.columns else np.full(len(df), "", dtype=str)
+    for name, source in CATEGORICAL_COLUMNS.items():
+        values = _clean_text(df[source]) if source in df.columns else np.full(len(df), "", dtype=str)
+        dictionary, codes = np.unique(values, return_inverse=True)
+        columns[f"{name}_values"] = dictionary
+        columns[f"{name}_codes"] = codes.astype(np.int32)
+    for name, source in NUMERIC_COLUMNS.items():
+        columns[name] = _clean_number(df[source]) if source in df.columns else np.full(len(df), np.nan)
+    return columns
+
+
+def _merge_columns(base: Dict[str, np.ndarray], other: Dict[str, np.ndarray]) -> Dict[str, np.ndarray]:
+    """base's rows plus other's, other replacing rows with the same listing ID"""
+    replaced = other["listing_id"][other["listing_id"] != ""]
+    keep = ~np.isin(base["listing_id"], replaced)
+    columns: Dict[str, np.ndarray] = {}
+    for name in (*TEXT_COLUMNS, *NUMERIC_COLUMNS):
+        columns[name] = np.concatenate([base[name][keep], other[name]])
+    for name in CATEGORICAL_COLUMNS:
+        values = np.concatenate([
+            base[f"{name}_values"][base[f"{name}_codes"][keep]],
+            other[f"{name}_values"][other[f"{name}_codes"]],
+        ])
+        dictionary, codes = np.unique(values, return_inverse=True)
+        columns[f"{name}_values"] = dictionary
+        columns[f"{name}_codes"] = codes.astype(np.int32)
+    return columns
+
+
+class ListingTable:
+    """Immutable columnar listing table with sorted and hash indexes"""
+
+    def __init__(self, columns: Dict[str, np.ndarray]):
+        self.columns = columns
+        self.size = len(columns["listing_id"])
+
+        # Sorted indexes: row order by value, NaNs last
+        self.sorted_rows = {name: np.argsort(columns[name], kind="stable") for name in NUMERIC_COLUMNS}
+        self.sorted_values = {name: columns[name][rows] for name, rows in self.sorted_rows.items()}
+
+        # Hash indexes
+        self.id_index = {listing_id: row for row, listing_id in enumerate(columns["listing_id"]) if listing_id}
+        self.category_index = {
+            name: {value.lower(): code for code, value in enumerate(columns[f"{name}_values"])}
+            for name in CATEGORICAL_COLUMNS
+        }
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "ListingTable":
+        return cls(_frame_columns(df))
+
+    def merged_with(self, other: "ListingTable") -> "ListingTable":
+        """This table plus other's rows, other replacing rows with the same listing ID"""
+        return ListingTable(_merge_columns(self.columns, other.columns))
+
+    def to_dataframe(self) -> pd.DataFrame:
+        data = {source: self.columns[name] for name, source in TEXT_COLUMNS.items()}
+        for name, source in CATEGORICAL_COLUMNS.items():
+            data[source] = self.columns[f"{name}_values"][self.columns[f"{name}_codes"]]
+        for name, source in NUMERIC_COLUMNS.items():
+            data[source] = self.columns[name]
+        return pd.DataFrame(data)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(tmp_path, **self.columns)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "ListingTable":
+        with np.load(path, allow_pickle=False) as data:
+            return cls({name: data[name] for name in data.files})
+
+    def _range_mask(self, name: str, low: Optional[float], high: Optional[float]) -> np.ndarray:
+        values = self.sorted_values[name]
+        start = np.searchsorted(values, low, side="left") if low is not None else 0
+        end = np.searchsorted(values, high, side="right") if high is not None else np.searchsorted(values, np.inf, side="right")
+        mask = np.zeros(self.size, dtype=bool)
+        mask[self.sorted_rows[name][start:end]] = True
+        return mask
+
+    def filter(
+        self,
+        listing_id: Optional[str] = None,
+        city: Optional[str] = None,
+        state: Optional[str] = None,
+        min_price: Optional[float] = None,
+        max_price: Optional[float] = None,
+        min_bedrooms: Optional[float] = None,
+        max_bedrooms: Optional[float] = None,
+        min_bathrooms: Optional[float] = None,
+        max_bathrooms: Optional[float] = None,
+        min_square_footage: Optional[float] = None,
+        max_square_footage: Optional[float] = None,
+    ) -> np.ndarray:
+        """Row numbers matching every given constraint"""
+        if listing_id is not None:
+            row = self.id_index.get(str(listing_id).strip())
+            return np.array([row] if row is not None else [], dtype=np.int64)
+
+        mask = np.ones(self.size, dtype=bool)
+        for name, value in (("city", city), ("state", state)):
+            if value is not None:
+                code = self.category_index[name].get(value.strip().lower())
+                if code is None:
+                    return np.array([], dtype=np.int64)
+                mask &= self.columns[f"{name}_codes"] == code
+
+        for name, low, high in (
+            ("price", min_price, max_price),
+            ("bedrooms", min_bedrooms, max_bedrooms),
+            ("bathrooms", min_bathrooms, max_bathrooms),
+            ("square_footage", min_square_footage, max_square_footage),
+        ):
+            if low is not None or high is not None:
+                mask &= self._range_mask(name, low, high)
+
+        return np.flatnonzero(mask)
+
+    def row(self, row: int) -> Dict[str, Any]:
+        record: Dict[str, Any] = {name: str(self.columns[name][row]) for name in TEXT_COLUMNS}
+        for name in CATEGORICAL_COLUMNS:
+            record[name] = str(self.columns[f"{name}_values"][self.columns[f"{name}_codes"][row]])
+        for name in NUMERIC_COLUMNS:
+            value = self.columns[name][row]
+            record[name] = None if np.isnan(value) else float(value)
+        return record
+
+    def rows(self, rows: np.ndarray, sort_by: Optional[str] = None, descending: bool = False, limit: int = 50) -> List[Dict[str, Any]]:
+        if sort_by:
+            order = np.argsort(self.columns[sort_by][rows], kind="stable")
+            rows = rows[order[::-1] if descending else order]
+        return [self.row(int(row)) for row in rows[:limit]]
+
+    def stats(self, rows: np.ndarray) -> Dict[str, Any]:
+        prices = self.columns["price"][rows]
+        prices = prices[~np.isnan(prices)]
+        return {
+            "count": int(len(rows)),
+            "min_price": float(prices.min()) if len(prices) else None,
+            "median_price": float(np.median(prices)) if len(prices) else None,
+            "max_price": float(prices.max()) if len(prices) else None,
+        }
+
+
+_table: Optional[ListingTable] = None
+_table_lock = threading.Lock()
+
+
+def table_path() -> str:
+    return os.path.join(config.CHROMA_DIR, "listings.npz")
+
+
+def get_listing_table() -> Optional[ListingTable]:
+    """Load the persisted listing table, or None if nothing has been ingested"""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None and os.path.exists(table_path()):
+                _table = ListingTable.load(table_path())
+                logger.info(f"Loaded listing table with {_table.size} listings")
+    return _table
+
+
+class ListingTableBuilder:
+    """
+    Builds the table during ingestion by upserting each parsed batch into its
+    columns, so only the columnar table is held rather than every batch read
+    from the feed. Indexes are built once, in publish().
+    """
+
+    def __init__(self, replace: bool = True):
+        existing = None if replace else get_listing_table()
+        self.columns: Optional[Dict[str, np.ndarray]] = existing.columns if existing is not None else None
+
+    def upsert(self, df: pd.DataFrame):
+        """Add a batch of listing rows read with dtype=str, replacing rows with the same listing ID"""
+        batch = _frame_columns(df)
+        self.columns = batch if self.columns is None else _merge_columns(self.columns, batch)
+
+    def publish(self) -> ListingTable:
+        """Persist the table and make it the one structured lookups use"""
+        global _table
+        columns = self.columns
+        if columns is None:
+            columns = _frame_columns(pd.DataFrame(columns=SOURCE_COLUMNS, dtype=str))
+        table = ListingTable(columns)
+        table.save(table_path())
+        with _table_lock:
+            _table = table
+        logger.info(f"Listing table rebuilt with {table.size} listings")
+        return table
+
+
+def constraint_filters(constraints: Dict[str, Any]) -> Dict[str, Any]:
+    """Map query_filters constraints onto ListingTable.filter arguments"""
+    return {
+        "city": constraints.get("city"),
+        "min_price": constraints.get("min_price"),
+        "max_price": constraints.get("max_price"),
+        "min_bedrooms": constraints.get("bedrooms"),
+        "min_bathrooms": constraints.get("bathrooms"),
+    }
+
+
+def _format_listing(record: Dict[str, Any]) -> str:
+    def number(value, suffix=""):
+        return "unknown" if value is None else f"{value:,.0f}{suffix}" if float(value).is_integer() else f"{value:,}{suffix}"
+
+    return (
+        f"Listing {record['listing_id']}: {record['title']} at {record['address']}, {record['city']}, "
+        f"{record['state']} {record['zip']}. Price ${number(record['price'])}, "
+        f"{number(record['bedrooms'])} bedrooms, {number(record['bathrooms'])} bathrooms, "
+        f"{number(record['square_footage'])} sq ft. Amenities: {record['amenities']}."
+    )
+
+
+def structured_context(message: str, listing_id: Optional[str] = None) -> List[Document]:
+    """
+    Exact facts from the listing table for the prompt: the listing the inquiry is
+    about (or any listing ID mentioned in the message), and match counts for
+    "how many ..." questions.
+    """
+    table = get_listing_table()
+    if table is None:
+        return []
+
+    facts = []
+    listing_ids = [listing_id] if listing_id else []
+    listing_ids += [token for token in _ID_TOKEN_RE.findall(message) if token in table.id_index]
+    for candidate in dict.fromkeys(str(value).strip() for value in listing_ids):
+        rows = table.filter(listing_id=candidate)
+        if len(rows):
+            facts.append(_format_listing(table.row(int(rows[0]))))
+
+    if _COUNT_QUESTION_RE.search(message):
+        cities = {str(value).lower(): str(value) for value in table.columns["city_values"]}
+        constraints = extract_constraints(message, cities)
+        if constraints:
+            stats = table.stats(table.filter(**constraint_filters(constraints)))
+            description = ", ".join(f"{key}={value}" for key, value in constraints.items())
+            facts.append(
+                f"Exact count from the listing database: {stats['count']} listings match ({description})"
+                + (f"; prices range from ${stats['min_price']:,.0f} to ${stats['max_price']:,.0f}, "
+                   f"median ${stats['median_price']:,.0f}." if stats["count"] and stats["min_price"] is not None else ".")
+            )
+
+    return [Document(page_content=fact, metadata={"source": "listing_table"}) for fact in facts]
@@ -1,19 +1,26 @@
-from langchain_openai import ChatOpenAI
 from langchain_core.prompts import PromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from app.config import config
+from functools import lru_cache
 import logging
 
 logger = logging.getLogger(__name__)
 
-# Initialize LLM
-llm = ChatOpenAI(
-    model_name=config.OPENAI_MODEL, 
-    temperature=config.LLM_TEMPERATURE,
-    api_key=config.OPENAI_API_KEY
-)
 parser = StrOutputParser()
 
+
+@lru_cache(maxsize=None)
+def get_llm():
+    """Chat model client, created on first use so importing this module stays cheap"""
+    from langchain_openai import ChatOpenAI
+
+    return ChatOpenAI(
+        model_name=config.OPENAI_MODEL, 
+        temperature=config.LLM_TEMPERATURE,
+        api_key=config.OPENAI_API_KEY,
+        max_retries=0  # Retried by app.core.rate_limit, which charges each attempt to the budget
+    )
+
 # Enhanced prompts with better instructions
 expand_prompt = PromptTemplate.from_template("""
 You are a real estate assistant. Your task is to clarify and expand the following real estate inquiry to make it more specific and searchable.
@@ -146,6 +153,12 @@ Response:
 """)
 }
 
-# Create chains
-expand_chain = expand_prompt | llm | parser
-category_chain = category_prompt | llm | parser
\ No newline at end of file
+# Chains are built lazily along with the LLM client
+@lru_cache(maxsize=None)
+def get_expand_chain():
+    return expand_prompt | get_llm() | parser
+
+
+@lru_cache(maxsize=None)
+def get_category_chain():
+    return category_prompt | get_llm() | parser
@@ -0,0 +1,144 @@
+"""
+Query understanding for retrieval.
+
+Extracts numeric and categorical constraints (price bounds, bedroom and bathroom
+minimums, city) from an inquiry and turns them into Chroma `where` filters,
+with a widening order for when a filter matches too few listings.
+"""
+
+from typing import Any, Dict, List, Optional
+import re
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5,
+    "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+}
+
+# Numbers start at a word boundary, so "someone" is not "one" and "x35" is not 35,
+# and never follow a letter and hyphen, so highway names like I-35 are not counts
+_NUMBER = r"(?<![A-Za-z]-)\b(\d+(?:\.\d+)?|(?:" + "|".join(NUMBER_WORDS) + r")\b)"
+_MONEY = r"\$?\s*(?<![A-Za-z]-)\b(\d[\d,]*(?:\.\d+)?)\s*(k|m|mm|thousand|million)?\b"
+
+BEDROOMS_RE = re.compile(_NUMBER + r"\s*\+?\s*-?\s*(?:bed(?:room)?s?|br|bd)\b", re.IGNORECASE)
+BATHROOMS_RE = re.compile(_NUMBER + r"\s*\+?\s*-?\s*(?:bath(?:room)?s?|ba)\b", re.IGNORECASE)
+PRICE_BETWEEN_RE = re.compile(r"\bbetween\s+" + _MONEY + r"\s*(?:and|-|to)\s*" + _MONEY, re.IGNORECASE)
+PRICE_MAX_RE = re.compile(r"\b(?:under|below|less than|no more than|at most|max(?:imum)?|up to|budget(?: of| is)?)\s*" + _MONEY, re.IGNORECASE)
+PRICE_MIN_RE = re.compile(r"\b(?:over|above|more than|at least|min(?:imum)?|starting at)\s*" + _MONEY, re.IGNORECASE)
+
+# Amounts below this are bedroom counts, years etc. rather than prices
+MIN_PLAUSIBLE_PRICE = 10000
+
+# Constraint groups dropped in order when a filter matches too few listings
+WIDENING_ORDER = [("max_price", "min_price"), ("bedrooms", "bathrooms"), ("city",)]
+
+
+def _number(text: str) -> float:
+    return float(NUMBER_WORDS.get(text.lower(), text))
+
+
+def _money(amount: str, suffix: Optional[str]) -> Optional[float]:
+    value = float(amount.replace(",", ""))
+    suffix = (suffix or "").lower()
+    if suffix in ("k", "thousand"):
+        value *= 1000
+    elif suffix in ("m", "mm", "million"):
+        value *= 1000000
+    return value if value >= MIN_PLAUSIBLE_PRICE else None
+
+
+def extract_constraints(message: str, cities: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """
+    Pull structured constraints out of an inquiry.
+
+    cities maps lowercased city names to the exact value stored in listing
+    metadata; only cities known to the index are recognized.
+    """
+    constraints: Dict[str, Any] = {}
+
+    match = BEDROOMS_RE.search(message)
+    if match:
+        constraints["bedrooms"] = _number(match.group(1))
+
+    match = BATHROOMS_RE.search(message)
+    if match:
+        constraints["bathrooms"] = _number(match.group(1))
+
+    match = PRICE_BETWEEN_RE.search(message)
+    if match:
+        low, high = _money(match.group(1), match.group(2)), _money(match.group(3), match.group(4))
+        if low is not None and high is not None:
+            constraints["min_price"], constraints["max_price"] = min(low, high), max(low, high)
+    else:
+        match = PRICE_MAX_RE.search(message)
+        if match and _money(match.group(1), match.group(2)) is not None:
+            constraints["max_price"] = _money(match.group(1), match.group(2))
+        match = PRICE_MIN_RE.search(message)
+        if match and _money(match.group(1), match.group(2)) is not None:
+            constraints["min_price"] = _money(match.group(1), match.group(2))
+
+    if cities:
+        lowered = message.lower()
+        # Prefer the longest name so "West Palm Beach" wins over "Palm Beach"
+        for name in sorted(cities, key=len, reverse=True):
+            if name and re.search(r"\b" + re.escape(name) + r"\b", lowered):
+                constraints["city"] = cities[name]
+                break
+
+    return constraints
+
+
+def build_where(constraints: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Translate constraints into a Chroma metadata filter"""
+    clauses: List[Dict[str, Any]] = []
+    if "city" in constraints:
+        clauses.append({"city": constraints["city"]})
+    if "min_price" in constraints:
+        clauses.append({"price": {"$gte": constraints["min_price"]}})
+    if "max_price" in constraints:
+        clauses.append({"price": {"$lte": constraints["max_price"]}})
+    if "bedrooms" in constraints:
+        clauses.append({"bedrooms": {"$gte": constraints["bedrooms"]}})
+    if "bathrooms" in constraints:
+        clauses.append({"bathrooms": {"$gte": constraints["bathrooms"]}})
+
+    if not clauses:
+        return None
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def widening_steps(constraints: Dict[str, Any]) -> List[Optional[Dict[str, Any]]]:
+    """Filters to try in order, from the full constraint set down to no filter"""
+    steps = []
+    remaining = dict(constraints)
+    while True:
+        where = build_where(remaining)
+        if where not in steps:
+            steps.append(where)
+        if where is None:
+            return steps
+        for group in WIDENING_ORDER:
+            if any(key in remaining for key in group):
+                for key in group:
+                    remaining.pop(key, None)
+                break
+
+
+def matches_where(metadata: Dict[str, Any], where: Optional[Dict[str, Any]]) -> bool:
+    """Evaluate a filter produced by build_where against a metadata dict in Python"""
+    if not where:
+        return True
+    if "$and" in where:
+        return all(matches_where(metadata, clause) for clause in where["$and"])
+
+    (key, condition), = where.items()
+    value = metadata.get(key)
+    if not isinstance(condition, dict):
+        return value == condition
+    try:
+        if "$gte" in condition and not float(value) >= condition["$gte"]:
+            return False
+        if "$lte" in condition and not float(value) <= condition["$lte"]:
+            return False
+    except (TypeError, ValueError):
+        return False
+    return True
@@ -0,0 +1,139 @@
+from typing import Optional
+from app.config import config
+import asyncio
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+class TokenBucket:
+    """
+    Async token bucket refilled continuously at a per-minute rate.
+
+    State is only touched between awaits on a single event loop, so no lock is
+    needed and the bucket is not bound to any particular loop.
+    """
+
+    def __init__(self, per_minute: float, capacity: float = None):
+        self.rate = per_minute / 60.0
+        self.capacity = capacity or per_minute
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self, amount: float = 1):
+        # Requests larger than the bucket would wait forever; cap them at capacity
+        amount = min(amount, self.capacity)
+        while True:
+            self._refill()
+            if self.tokens >= amount:
+                self.tokens -= amount
+                return
+            await asyncio.sleep((amount - self.tokens) / self.rate)
+
+
+class OpenAIRateLimiter:
+    """Requests-per-minute and tokens-per-minute budgets for OpenAI calls"""
+
+    def __init__(self, requests_per_minute: float, tokens_per_minute: float):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+
+    async def acquire(self, tokens: int):
+        await self.requests.acquire(1)
+        await self.tokens.acquire(tokens)
+
+
+openai_limiter = OpenAIRateLimiter(config.OPENAI_RPM_LIMIT, config.OPENAI_TPM_LIMIT)
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough prompt + completion token estimate (~4 characters per token)"""
+    prompt_tokens = sum(len(text) for text in texts) // 4
+    return prompt_tokens + config.OPENAI_COMPLETION_TOKENS_ESTIMATE
+
+
+def is_retryable(error: Exception) -> bool:
+    """True for rate limits, timeouts, connection errors and 5xx responses"""
+    import openai
+
+    retryable = (
+        openai.RateLimitError,
+        openai.APITimeoutError,
+        openai.APIConnectionError,
+        openai.InternalServerError,
+    )
+    if isinstance(error, retryable):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+
+def _retry_delay(attempt: int) -> float:
+    """Full-jitter exponential backoff before retry number attempt + 1"""
+    return random.uniform(0, min(config.OPENAI_RETRY_MAX_DELAY, config.OPENAI_RETRY_BASE_DELAY * 2 ** attempt))
+
+
+async def _call(func, args, kwargs, tokens: Optional[int]):
+    # The OpenAI clients are built with max_retries=0, so every attempt happens
+    # here and each one waits for its own rate-limit budget
+    for attempt in range(config.OPENAI_MAX_RETRIES + 1):
+        if tokens is not None:
+            await openai_limiter.acquire(tokens)
+        try:
+            return await func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= config.OPENAI_MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"OpenAI call failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
+
+
+async def with_retries(func, *args, **kwargs):
+    """Await func(*args, **kwargs), retrying retryable errors with full-jitter exponential backoff"""
+    return await _call(func, args, kwargs, None)
+
+
+def with_retries_sync(func, *args, **kwargs):
+    """Blocking counterpart of with_retries for worker threads"""
+    for attempt in range(config.OPENAI_MAX_RETRIES + 1):
+        try:
+            return func(*args, **kwargs)
+        except Exception as e:
+            if attempt >= config.OPENAI_MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"OpenAI call failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+            time.sleep(delay)
+
+
+async def limited_call(func, *args, tokens: int, **kwargs):
+    """Call with retries, waiting for rate-limit budget before every attempt"""
+    return await _call(func, args, kwargs, tokens)
+
+
+async def limited_stream(stream_factory, *, tokens: int):
+    """
+    Yield chunks from stream_factory(), waiting for rate-limit budget before
+    every attempt. Retryable errors are retried only until the first chunk
+    arrives; after that a retry would repeat text the caller has already forwarded.
+    """
+    for attempt in range(config.OPENAI_MAX_RETRIES + 1):
+        await openai_limiter.acquire(tokens)
+        started = False
+        try:
+            async for chunk in stream_factory():
+                started = True
+                yield chunk
+            return
+        except Exception as e:
+            if started or attempt >= config.OPENAI_MAX_RETRIES or not is_retryable(e):
+                raise
+            delay = _retry_delay(attempt)
+            logger.warning(f"OpenAI stream failed ({e.__class__.__name__}), retrying in {delay:.2f}s")
+            await asyncio.sleep(delay)
@@ -1,14 +1,32 @@
-from langchain_chroma import Chroma
+from langchain_core.documents import Document
 from app.core.embeddings import get_embedding_model
+from app.core.lexical_index import get_lexical_index, reciprocal_rank_fusion
+from app.core.query_filters import extract_constraints, matches_where, widening_steps
+from app.core.retrieval_cache import RetrievalCache
 from app.config import config
+from typing import List, Optional
+import asyncio
+import hashlib
 import os
+import threading
 import logging
 
 logger = logging.getLogger(__name__)
 
-embedding_model = get_embedding_model()
+embedding_model = None
 vectorstore = None
 retriever = None
+_init_lock = threading.RLock()
+
+
+def get_embeddings():
+    """Get the (cached) embedding model, creating it on first use"""
+    global embedding_model
+    if embedding_model is None:
+        with _init_lock:
+            if embedding_model is None:
+                embedding_model = get_embedding_model()
+    return embedding_model
 
 
 def initialize_vectorstore():
@@ -16,34 +34,198 @@ def initialize_vectorstore():
     global vectorstore, retriever
     
     try:
+        from langchain_chroma import Chroma
+
         # Create directory if it doesn't exist
         os.makedirs(config.CHROMA_DIR, exist_ok=True)
         
-        vectorstore = Chroma(
+        store = Chroma(
             persist_directory=config.CHROMA_DIR, 
-            embedding_function=embedding_model
+            embedding_function=get_embeddings()
         )
         
-        retriever = vectorstore.as_retriever(
+        retriever = store.as_retriever(
             search_kwargs={"k": config.MAX_RETRIEVAL_DOCS}
         )
+        vectorstore = store
         
-        logger.info(f"Vector store initialized with {len(vectorstore.get()['documents'])} documents")
+        # count() is O(1); get() would load every document just to log a number
+        logger.info(f"Vector store initialized with {store._collection.count()} documents")
         
     except Exception as e:
         logger.error(f"Failed to initialize vector store: {e}")
         raise
 
 
+def _ensure_vectorstore():
+    if vectorstore is None:
+        with _init_lock:
+            if vectorstore is None:
+                initialize_vectorstore()
+
+
 def get_retriever():
-    """Get retriever instance"""
-    if retriever is None:
-        raise RuntimeError("Vector store not initialized. Call initialize_vectorstore() first.")
+    """Get retriever instance, initializing the vector store on first use"""
+    _ensure_vectorstore()
     return retriever
 
 
 def get_vectorstore():
-    """Get vector store instance"""
-    if vectorstore is None:
-        raise RuntimeError("Vector store not initialized. Call initialize_vectorstore() first.")
-    return vectorstore
\ No newline at end of file
+    """Get vector store instance, initializing it on first use"""
+    _ensure_vectorstore()
+    return vectorstore
+
+
+# Distinct metadata values used to resolve cities and listing IDs in inquiries
+_facets = None
+
+
+def get_listing_facets() -> dict:
+    """Known cities (lowercased -> stored value) and listing IDs (str -> stored value)"""
+    global _facets
+    if _facets is None:
+        metadatas = get_vectorstore().get(include=["metadatas"])["metadatas"]
+        cities, listing_ids = {}, {}
+        for metadata in metadatas:
+            metadata = metadata or {}
+            if metadata.get("city"):
+                cities[str(metadata["city"]).lower()] = metadata["city"]
+            if metadata.get("listing_id") is not None:
+                listing_ids[str(metadata["listing_id"]).strip()] = metadata["listing_id"]
+        _facets = {"cities": cities, "listing_ids": listing_ids}
+    return _facets
+
+
+def invalidate_listing_facets():
+    """Forget cached facets after the index changes"""
+    global _facets
+    _facets = None
+
+
+def _pinned_where(listing_id: Optional[str]) -> Optional[dict]:
+    if not listing_id:
+        return None
+    stored = get_listing_facets()["listing_ids"].get(str(listing_id).strip())
+    return {"listing_id": stored} if stored is not None else None
+
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+
+retrieval_cache = RetrievalCache(
+    max_entries=config.RETRIEVAL_CACHE_SIZE,
+    ttl_seconds=config.RETRIEVAL_CACHE_TTL
+)
+
+
+def bump_index_generation() -> int:
+    """Mark every cached retrieval result stale after the index changes"""
+    return retrieval_cache.bump_generation()
+
+
+def _normalize(text: str) -> str:
+    return " ".join(text.lower().split())
+
+
+def _cache_key(query: str, lexical_query: str, constraints: dict, listing_id: Optional[str], k: int, mode: str) -> tuple:
+    # BM25 ranks on the message as well as the query, so lexical results depend on it too
+    lexical_hash = "" if mode == "dense" else hashlib.sha1(_normalize(lexical_query).encode("utf-8")).hexdigest()
+    return (_normalize(query), lexical_hash, tuple(sorted(constraints.items())), str(listing_id or "").strip(), k, mode)
+
+
+def retrieve_listings(
+    query: str,
+    message: str,
+    listing_id: Optional[str] = None,
+    k: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Document]:
+    """
+    Metadata pre-filtered retrieval.
+
+    Chunks of the listing the inquiry is about come first; the rest of the k slots
+    are filled by a search restricted by constraints extracted from the message,
+    widening the filter step by step while it matches too few chunks.
+
+    mode selects dense (Chroma), lexical (local BM25, no embedding call) or hybrid
+    (both, fused with reciprocal rank fusion); BM25 ranks on the message plus the
+    query. Results are cached per normalized query (and message, unless dense),
+    filter set and index generation.
+    """
+    k = k or config.MAX_RETRIEVAL_DOCS
+    mode = mode or config.RETRIEVAL_MODE
+    if mode not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode: {mode}")
+    store = get_vectorstore()
+
+    constraints = extract_constraints(message, get_listing_facets()["cities"])
+    lexical_query = query if query == message else f"{message}\n{query}"
+    key = _cache_key(query, lexical_query, constraints, listing_id, k, mode)
+    cached = retrieval_cache.get(key)
+    if cached is not None:
+        return list(cached)
+    generation = retrieval_cache.generation
+
+    documents = _search(store, query, lexical_query, constraints, listing_id, k, mode)
+    retrieval_cache.put(key, documents, generation)
+    return list(documents)
+
+
+def _documents_by_id(store, ids: List[str]) -> List[Document]:
+    """Chunks for vectorstore IDs, in the order given"""
+    if not ids:
+        return []
+    stored = store.get(ids=ids, include=["documents", "metadatas"])
+    by_id = {
+        document_id: Document(page_content=text, metadata=metadata or {})
+        for document_id, text, metadata in zip(stored["ids"], stored["documents"], stored["metadatas"])
+    }
+    return [by_id[document_id] for document_id in ids if document_id in by_id]
+
+
+def _search(store, query: str, lexical_query: str, constraints: dict, listing_id: Optional[str], k: int, mode: str) -> List[Document]:
+    """Uncached pinned + filtered search behind retrieve_listings"""
+    pinned = []
+    pinned_where = _pinned_where(listing_id)
+    if pinned_where:
+        pinned = store.get(where=pinned_where, limit=k, include=["documents", "metadatas"])
+        pinned = [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(pinned["documents"], pinned["metadatas"])
+        ]
+
+    remaining = k - len(pinned)
+    if remaining <= 0:
+        return pinned[:k]
+
+    lexical_index = get_lexical_index(store) if mode != "dense" else None
+    vector = store.embeddings.embed_query(query) if mode != "lexical" else None
+    fetch = remaining + len(pinned)
+
+    results = []
+    for where in widening_steps(constraints):
+        rankings = []
+        if vector is not None:
+            rankings.append(store.similarity_search_by_vector(vector, k=fetch, filter=where))
+        if lexical_index is not None:
+            hits = lexical_index.search(lexical_query, fetch, predicate=lambda metadata: matches_where(metadata, where))
+            rankings.append(_documents_by_id(store, [document_id for document_id, _ in hits]))
+        results = rankings[0] if len(rankings) == 1 else reciprocal_rank_fusion(rankings)
+
+        if len(results) >= min(config.MIN_FILTERED_RESULTS, remaining) or where is None:
+            break
+        logger.debug(f"Filter {where} matched {len(results)} chunks, widening")
+
+    pinned_texts = {document.page_content for document in pinned}
+    others = [document for document in results if document.page_content not in pinned_texts]
+    return pinned + others[:remaining]
+
+
+async def aretrieve_listings(
+    query: str,
+    message: str,
+    listing_id: Optional[str] = None,
+    k: Optional[int] = None,
+    mode: Optional[str] = None
+) -> List[Document]:
+    """Async counterpart of retrieve_listings"""
+    return await asyncio.to_thread(retrieve_listings, query, message, listing_id, k, mode)
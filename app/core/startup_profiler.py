@@ -0,0 +1,123 @@
+import importlib.abc
+import asyncio
+import sys
+import time
+import logging
+from contextlib import contextmanager
+from typing import Dict
+
+# app.config is imported lazily so that install() can time it with the rest of the app
+
+logger = logging.getLogger(__name__)
+
+module_timings: Dict[str, float] = {}
+step_timings: Dict[str, float] = {}
+
+
+class _TimedLoader(importlib.abc.Loader):
+    """Wraps a module loader and records how long exec_module takes"""
+
+    def __init__(self, loader):
+        self.loader = loader
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        start = time.perf_counter()
+        try:
+            self.loader.exec_module(module)
+        finally:
+            # Inclusive of anything the module imports while executing
+            module_timings[module.__name__] = time.perf_counter() - start
+
+
+class _TimedFinder(importlib.abc.MetaPathFinder):
+    """Meta path finder that times execution of modules under the given prefixes"""
+
+    def __init__(self, prefixes):
+        self.prefixes = tuple(prefixes)
+
+    def find_spec(self, fullname, path, target=None):
+        if not fullname.startswith(self.prefixes):
+            return None
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, "find_spec"):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+                    spec.loader = _TimedLoader(spec.loader)
+                return spec
+        return None
+
+
+def install(prefixes=("app.", "langchain", "chromadb", "openai", "pandas", "numpy", "sqlalchemy", "fastapi")):
+    """Start timing imports of matching modules; call before importing the app"""
+    if not any(isinstance(finder, _TimedFinder) for finder in sys.meta_path):
+        sys.meta_path.insert(0, _TimedFinder(prefixes))
+
+
+@contextmanager
+def startup_step(name: str):
+    """Time an initialization step and log it when STARTUP_PROFILE is enabled"""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        step_timings[name] = time.perf_counter() - start
+        from app.config import config
+        if config.STARTUP_PROFILE:
+            logger.info(f"Startup step {name} took {step_timings[name]:.3f}s")
+
+
+def report(top: int = 20) -> str:
+    """Slowest module imports and init steps as a printable table"""
+    lines = ["Module imports (inclusive):"]
+    for name, seconds in sorted(module_timings.items(), key=lambda item: -item[1])[:top]:
+        lines.append(f"  {seconds:8.3f}s  {name}")
+    if step_timings:
+        lines.append("Init steps:")
+        for name, seconds in step_timings.items():
+            lines.append(f"  {seconds:8.3f}s  {name}")
+    return "\n".join(lines)
+
+
+async def _run_lifespan(app) -> float:
+    """Seconds the app's lifespan takes to reach its yield; shuts it down again afterwards"""
+    start = time.perf_counter()
+    async with app.router.lifespan_context(app):
+        elapsed = time.perf_counter() - start
+    return elapsed
+
+
+def main() -> int:
+    """
+    Import app.main and run its lifespan startup, failing if the two together
+    take longer than STARTUP_BUDGET_SECONDS
+    """
+    install()
+    start = time.perf_counter()
+    import app.main
+    import_seconds = time.perf_counter() - start
+
+    from app.config import config
+    try:
+        lifespan_seconds = asyncio.run(_run_lifespan(app.main.app))
+    except Exception as e:
+        print(report())
+        print(f"Lifespan startup failed: {e}")
+        return 1
+    total = import_seconds + lifespan_seconds
+
+    print(report())
+    print(f"Imported app.main in {import_seconds:.3f}s, lifespan startup took {lifespan_seconds:.3f}s")
+    print(f"Total {total:.3f}s (budget {config.STARTUP_BUDGET_SECONDS:.2f}s)")
+    if total > config.STARTUP_BUDGET_SECONDS:
+        print("Startup budget exceeded")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
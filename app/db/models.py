@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime, func
+from sqlalchemy import Column, Integer, String, Text, Date, DateTime, Index, UniqueConstraint, func
 from app.db.session import Base
 from datetime import datetime
 
@@ -8,14 +8,91 @@ class InquiryHistory(Base):
 
     id = Column(Integer, primary_key=True, index=True)  # Local DB ID
     inquiry_id = Column(String, nullable=True)          # Inquiry ID from the file
+    request_fingerprint = Column(String(64), nullable=True)  # Hash of the request that claimed inquiry_id
     listing_id = Column(String, nullable=True)          # Listing ID
     name = Column(String, nullable=True)                # Inquirer Name
-    email = Column(String, nullable=False)              # Inquirer Email
+    email = Column(String, nullable=False, index=True)  # Inquirer Email
     phone_number = Column(String, nullable=True)        # Phone Number
     message = Column(Text, nullable=True)               # Inquiry message
-    category = Column(String, nullable=True)            # AI-determined category
+    category = Column(String, nullable=True, index=True)  # AI-determined category
     response = Column(Text, nullable=True)              # AI-generated response
     email_title = Column(String, nullable=True)         # Email subject (optional)
     email_body = Column(Text, nullable=True)            # Email body (optional)
     file_date = Column(String, nullable=True)           # Date from file (string parsed)
-    created_at = Column(DateTime, default=datetime.utcnow)  # Record creation timestamp
\ No newline at end of file
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)  # Record creation timestamp
+
+    __table_args__ = (
+        # Keyset pagination order for /inquiries/history
+        Index("ix_inquiry_history_created_at_id", "created_at", "id"),
+        # Idempotency key; NULLs (failed or ID-less inquiries) are not constrained
+        Index("uq_inquiry_history_inquiry_id", "inquiry_id", unique=True),
+    )
+
+
+class InquiryDailyCategory(Base):
+    """Inquiries per day and category, maintained as history rows are saved"""
+    __tablename__ = "inquiry_daily_category"
+
+    day = Column(Date, primary_key=True)
+    category = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class InquiryDailyEmail(Base):
+    """Inquiries per day and sender email, maintained as history rows are saved"""
+    __tablename__ = "inquiry_daily_email"
+
+    day = Column(Date, primary_key=True)
+    email = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class BatchJob(Base):
+    __tablename__ = "batch_jobs"
+
+    id = Column(String, primary_key=True)                   # Job ID (uuid)
+    status = Column(String, nullable=False, default="in_progress")
+    total = Column(Integer, nullable=False, default=0)      # Inquiries in the job
+    progress = Column(Integer, nullable=False, default=0)   # Inquiries finished
+    succeeded = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    rejected = Column(Integer, nullable=False, default=0)   # Upload rows that failed validation
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+    completed_at = Column(DateTime, nullable=True)
+
+
+class BatchJobResult(Base):
+    __tablename__ = "batch_job_results"
+    __table_args__ = (
+        UniqueConstraint("job_id", "item_index", name="uq_batch_job_results_job_item"),
+    )
+
+    id = Column(Integer, primary_key=True)
+    job_id = Column(String, nullable=False)                 # Owning batch job
+    item_index = Column(Integer, nullable=False)            # Position in the uploaded file
+    email = Column(String, nullable=True)
+    category = Column(String, nullable=True)
+    response = Column(Text, nullable=True)
+    status = Column(String, nullable=True)
+    error = Column(Text, nullable=True)
+
+
+class EmailOutbox(Base):
+    __tablename__ = "email_outbox"
+
+    id = Column(Integer, primary_key=True)
+    inquiry_history_id = Column(Integer, nullable=True)     # InquiryHistory row the reply belongs to
+    recipient = Column(String, nullable=False)
+    subject = Column(String, nullable=False)
+    body = Column(Text, nullable=False)
+    status = Column(String, nullable=False, default="pending")  # pending, sending, sent, failed
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    next_attempt_at = Column(DateTime, default=datetime.utcnow)
+    claimed_at = Column(DateTime, nullable=True)            # When a dispatcher marked it sending
+    created_at = Column(DateTime, default=datetime.utcnow)
+    sent_at = Column(DateTime, nullable=True)
+
+    __table_args__ = (
+        Index("ix_email_outbox_status_next_attempt", "status", "next_attempt_at"),
+    )
@@ -1,34 +1,79 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import logging
-from app.api import ingest, inquiries
-from app.db.session import engine
+from app.api import ingest, inquiries, listings
+from app.db.session import engine, add_missing_columns, ensure_indexes
 from app.db.models import Base
-from app.core.retrieval import initialize_vectorstore
+from app.core.retrieval import get_vectorstore
+from app.core.startup_profiler import startup_step
+from app.services.mailer import mailer
+from app.services.outbox import outbox_dispatcher
+from app.services.health import health_prober
+from app.services.analytics import ensure_rollups
+from app.services.search_index import ensure_search_index
+from app.services.history_writer import history_writer
+from app.config import config
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def _warm_vectorstore():
+    try:
+        with startup_step("vectorstore"):
+            get_vectorstore()
+        logger.info("Vector store initialized")
+    except Exception as e:
+        logger.error(f"Vector store warmup failed: {e}")
+
+
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
     logger.info("Starting up Real Estate RAG application...")
+
+    with startup_step("config.validate"):
+        config.validate()
     
     # Create database tables
-    Base.metadata.create_all(bind=engine)
+    with startup_step("create_tables"):
+        Base.metadata.create_all(bind=engine)
+        add_missing_columns()
+        ensure_indexes()
+    with startup_step("ensure_rollups"):
+        ensure_rollups()
+    with startup_step("ensure_search_index"):
+        ensure_search_index()
     logger.info("Database tables created")
     
-    # Initialize vector store
-    initialize_vectorstore()
-    logger.info("Vector store initialized")
+    # Warm the vector store in the background; requests that arrive first
+    # initialize it on demand
+    warmup = asyncio.create_task(asyncio.to_thread(_warm_vectorstore))
+
+    # Start draining queued reply emails
+    if config.EMAIL_ENABLED:
+        outbox_dispatcher.start()
+
+    # Persist inquiry history in bulk off the request path
+    history_writer.start()
+
+    # Probe dependencies on a schedule so /inquiries/status only reads a snapshot
+    health_prober.start()
     
     yield
     
     # Shutdown
     logger.info("Shutting down...")
+    if not warmup.done():
+        warmup.cancel()
+    await health_prober.stop()
+    # Flush queued history (and the reply emails it enqueues) before the outbox stops
+    await asyncio.to_thread(history_writer.stop)
+    await outbox_dispatcher.stop()
+    mailer.close()
 
 app = FastAPI(
     title="Real Estate Inquiry Assistant",
@@ -49,6 +94,7 @@ app.add_middleware(
 # Include routers
 app.include_router(ingest.router, prefix="/ingest", tags=["Ingestion"])
 app.include_router(inquiries.router, prefix="/inquiries", tags=["Inquiries"])
+app.include_router(listings.router, prefix="/listings", tags=["Listings"])
 
 
 @app.get("/")
@@ -24,6 +24,8 @@ class InquiryResponse(BaseModel):
     email_body: Optional[str] = None
     processing_id: Optional[str] = None
     processed_at: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None
+    replayed: bool = False
 
 
 class InquiryHistoryResponse(BaseModel):
@@ -38,6 +40,11 @@ class InquiryHistoryResponse(BaseModel):
     created_at: datetime
 
 
+class InquiryHistoryPage(BaseModel):
+    items: List[InquiryHistoryResponse]
+    next_cursor: Optional[str] = None
+
+
 class BatchInquiryRequest(BaseModel):
     inquiries: List[InquiryRequest]
     
@@ -55,6 +62,26 @@ class JobMetadata(BaseModel):
     progress: int
     total: int
     status: str
+    succeeded: int = 0
+    failed: int = 0
+    rejected: int = 0
+    created_at: Optional[datetime] = None
+    completed_at: Optional[datetime] = None
+
+
+class BatchJobResultItem(BaseModel):
+    index: int
+    email: Optional[str] = None
+    category: Optional[str] = None
+    response: Optional[str] = None
+    status: Optional[str] = None
+    error: Optional[str] = None
+
+
+class BatchJobResultsPage(BaseModel):
+    job_id: str
+    results: List[BatchJobResultItem]
+    next_cursor: Optional[int] = None
 
 
 class BatchJobResponse(BaseModel):
@@ -69,10 +96,19 @@ class InquiryAnalyticsResponse(BaseModel):
     top_users: List[Dict[str, Any]]
 
 
+class DependencyStatus(BaseModel):
+    status: str
+    latency_ms: float
+    last_checked: str
+    last_success: Optional[str] = None
+    error: Optional[str] = None
+
+
 class InquiryStatusResponse(BaseModel):
     status: str
     database_status: str
     vectorstore_status: str
     recent_inquiries_count: int
-    last_check: str
+    last_check: Optional[str] = None
+    dependencies: Dict[str, DependencyStatus] = {}
     error_message: Optional[str] = None
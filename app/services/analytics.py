@@ -0,0 +1,139 @@
+"""
+Daily analytics rollups.
+
+Every saved InquiryHistory row increments a (day, category) and a (day, email)
+counter in the same transaction, so /inquiries/analytics aggregates at most one
+row per day and key instead of scanning inquiry_history.
+"""
+
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Iterable
+from sqlalchemy import delete, desc, func, insert, select, update
+from sqlalchemy.orm import Session
+from app.db.session import SessionLocal
+from app.db.models import InquiryHistory, InquiryDailyCategory, InquiryDailyEmail
+import logging
+
+logger = logging.getLogger(__name__)
+
+UNCATEGORIZED = "uncategorized"
+
+# Rows per multi-row upsert: 3 bound parameters each keeps a statement well
+# under SQLite's default limit of 999 variables on older builds
+UPSERT_CHUNK_ROWS = 200
+
+
+def _upsert_counts(db_session: Session, model, key_column: str, counts: Counter):
+    """Add counts to (day, key) rows, creating any that do not exist yet"""
+    dialect = db_session.get_bind().dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        rows = [{"day": day, key_column: key, "count": n} for (day, key), n in counts.items()]
+        for start in range(0, len(rows), UPSERT_CHUNK_ROWS):
+            stmt = dialect_insert(model).values(rows[start:start + UPSERT_CHUNK_ROWS])
+            stmt = stmt.on_conflict_do_update(
+                index_elements=["day", key_column],
+                set_={"count": model.count + stmt.excluded.count}
+            )
+            db_session.execute(stmt)
+        return
+
+    for (day, key), n in counts.items():
+        updated = db_session.execute(
+            update(model)
+            .where(model.day == day, getattr(model, key_column) == key)
+            .values(count=model.count + n)
+        ).rowcount
+        if not updated:
+            db_session.execute(insert(model).values(day=day, count=n, **{key_column: key}))
+
+
+def record_inquiries(db_session: Session, records: Iterable[InquiryHistory]):
+    """Count flushed history rows into the daily rollups; commits with the caller"""
+    categories = Counter()
+    emails = Counter()
+    for record in records:
+        day = (record.created_at or datetime.utcnow()).date()
+        categories[(day, record.category or UNCATEGORIZED)] += 1
+        emails[(day, record.email)] += 1
+    if categories:
+        _upsert_counts(db_session, InquiryDailyCategory, "category", categories)
+        _upsert_counts(db_session, InquiryDailyEmail, "email", emails)
+
+
+def rebuild_rollups(db_session: Session):
+    """Recompute both rollup tables from inquiry_history"""
+    day = func.date(InquiryHistory.created_at)
+    db_session.execute(delete(InquiryDailyCategory))
+    db_session.execute(delete(InquiryDailyEmail))
+    category_rows = db_session.execute(
+        select(day, func.coalesce(InquiryHistory.category, UNCATEGORIZED), func.count())
+        .group_by(day, func.coalesce(InquiryHistory.category, UNCATEGORIZED))
+    ).all()
+    email_rows = db_session.execute(
+        select(day, InquiryHistory.email, func.count()).group_by(day, InquiryHistory.email)
+    ).all()
+    db_session.add_all(
+        InquiryDailyCategory(day=_as_date(d), category=category, count=n) for d, category, n in category_rows
+    )
+    db_session.add_all(
+        InquiryDailyEmail(day=_as_date(d), email=email, count=n) for d, email, n in email_rows
+    )
+    db_session.commit()
+    logger.info(f"Rebuilt analytics rollups: {len(category_rows)} category rows, {len(email_rows)} email rows")
+
+
+def _as_date(value) -> date:
+    # SQLite's date() returns a string, Postgres returns a date
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def ensure_rollups():
+    """Backfill the rollups if they are empty but inquiry history is not"""
+    with SessionLocal() as db:
+        rollups_empty = db.execute(select(InquiryDailyCategory.day).limit(1)).first() is None
+        if rollups_empty and db.execute(select(InquiryHistory.id).limit(1)).first() is not None:
+            rebuild_rollups(db)
+
+
+def get_analytics(db_session: Session, days: int) -> Dict[str, Any]:
+    """Totals, category split, daily counts and top senders for the last `days` days"""
+    start_day = (datetime.utcnow() - timedelta(days=days)).date()
+
+    category_stats = db_session.execute(
+        select(InquiryDailyCategory.category, func.sum(InquiryDailyCategory.count))
+        .where(InquiryDailyCategory.day >= start_day)
+        .group_by(InquiryDailyCategory.category)
+    ).all()
+
+    daily_stats = db_session.execute(
+        select(InquiryDailyCategory.day, func.sum(InquiryDailyCategory.count))
+        .where(InquiryDailyCategory.day >= start_day)
+        .group_by(InquiryDailyCategory.day)
+    ).all()
+
+    email_total = func.sum(InquiryDailyEmail.count)
+    top_users = db_session.execute(
+        select(InquiryDailyEmail.email, email_total)
+        .where(InquiryDailyEmail.day >= start_day)
+        .group_by(InquiryDailyEmail.email)
+        .order_by(desc(email_total))
+        .limit(10)
+    ).all()
+
+    return {
+        "total_inquiries": sum(int(count) for _, count in category_stats),
+        "category_distribution": {category: int(count) for category, count in category_stats},
+        "daily_counts": {str(day): int(count) for day, count in daily_stats},
+        "top_users": [{"email": email, "count": int(count)} for email, count in top_users],
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    with SessionLocal() as db:
+        rebuild_rollups(db)
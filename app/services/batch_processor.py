@@ -1,82 +1,79 @@
-from typing import List, Dict, Any
-from app.schemas import InquiryRequest, InquiryResponse
-from app.services.processor import process_inquiry
+from typing import Dict, Any, AsyncIterator, Callable, Optional, Tuple
+from app.config import config
+from app.schemas import InquiryRequest
+from app.services.idempotency import deduplicator
 import logging
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
+import inspect
 import time
 
 logger = logging.getLogger(__name__)
 
 
-def process_batch_inquiries(inquiries: List[InquiryRequest]) -> List[Dict[str, Any]]:
+def _error_result(inquiry: InquiryRequest, reason: str) -> Dict[str, Any]:
+    return {
+        "email": inquiry.email,
+        "category": "General Inquiry",
+        "response": "Sorry, we encountered an error processing your inquiry.",
+        "email_title": "Error Processing Inquiry",
+        "email_body": "We apologize for the inconvenience. Please try again later.",
+        "status": "failed",
+        "error": reason
+    }
+
+
+async def run_batch_stream(
+    items: AsyncIterator[Tuple[int, InquiryRequest]],
+    on_complete: Callable[[int, InquiryRequest, Dict[str, Any]], Any],
+    concurrency: Optional[int] = None,
+    item_timeout: Optional[float] = None
+) -> int:
     """
-    Process multiple inquiries efficiently using threading
+    Run batch inquiries through the async pipeline with bounded concurrency.
+
+    (index, inquiry) pairs are pulled from an async iterator as slots free up,
+    so processing starts before the input is fully read and at most
+    `concurrency` inquiries are held at once. Each item gets its own timeout,
+    started only once it holds a slot. OpenAI rate limiting and retries happen
+    inside the pipeline stages, and an inquiry_id that was already processed
+    returns its stored result. Results are only delivered through
+    on_complete(index, inquiry, result), awaited if it returns an awaitable.
+    Returns the number processed.
     """
-    logger.info(f"Starting batch processing of {len(inquiries)} inquiries")
+    concurrency = concurrency or config.BATCH_CONCURRENCY
+    item_timeout = item_timeout or config.BATCH_ITEM_TIMEOUT
+    semaphore = asyncio.Semaphore(concurrency)
+    tasks = set()
+    count = 0
     start_time = time.time()
-    
-    results = []
-    
-    # For small batches, process sequentially
-    if len(inquiries) <= 5:
-        for inquiry in inquiries:
+
+    async def run_one(index: int, inquiry: InquiryRequest):
+        try:
             try:
-                result = process_inquiry(inquiry)
-                results.append(result)
+                result = await asyncio.wait_for(deduplicator.process_once(inquiry), timeout=item_timeout)
+            except asyncio.TimeoutError:
+                logger.error(f"Inquiry from {inquiry.email} timed out after {item_timeout}s")
+                result = _error_result(inquiry, "timeout")
             except Exception as e:
                 logger.error(f"Error processing inquiry from {inquiry.email}: {e}")
-                results.append({
-                    "email": inquiry.email,
-                    "category": "General Inquiry",
-                    "response": "Sorry, we encountered an error processing your inquiry.",
-                    "email_title": "Error Processing Inquiry",
-                    "email_body": "We apologize for the inconvenience. Please try again later."
-                })
-    else:
-        # For larger batches, use thread pool
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            futures = [executor.submit(process_inquiry, inquiry) for inquiry in inquiries]
-            
-            for i, future in enumerate(futures):
-                try:
-                    result = future.result(timeout=30)  # 30 second timeout per inquiry
-                    results.append(result)
-                except Exception as e:
-                    logger.error(f"Error processing inquiry from {inquiries[i].email}: {e}")
-                    results.append({
-                        "email": inquiries[i].email,
-                        "category": "General Inquiry",
-                        "response": "Sorry, we encountered an error processing your inquiry.",
-                        "email_title": "Error Processing Inquiry",
-                        "email_body": "We apologize for the inconvenience. Please try again later."
-                    })
-    
-    processing_time = time.time() - start_time
-    logger.info(f"Batch processing completed in {processing_time:.2f} seconds")
-    
-    return results
-  
+                result = _error_result(inquiry, str(e))
 
-async def process_batch_async(inquiries: List[InquiryRequest]) -> List[InquiryResponse]:
-    """
-    Asynchronously process a batch of inquiries.
-    Returns a list of InquiryResponse objects.
-    """
+            outcome = on_complete(index, inquiry, result)
+            if inspect.isawaitable(outcome):
+                await outcome
+        finally:
+            semaphore.release()
 
-    async def safe_process(inquiry: InquiryRequest) -> InquiryResponse:
-        try:
-            result = await asyncio.to_thread(process_inquiry, inquiry)
-            return InquiryResponse(**result)
-        except Exception as e:
-            logger.error(f"Failed to process inquiry {inquiry.email or inquiry.listing_id}: {e}")
-            return InquiryResponse(
-                email=inquiry.email,
-                category="Error",
-                response="Unable to process this inquiry due to internal error."
-            )
+    async for index, inquiry in items:
+        # Take the slot before reading further so input is consumed at processing speed
+        await semaphore.acquire()
+        task = asyncio.create_task(run_one(index, inquiry))
+        tasks.add(task)
+        task.add_done_callback(tasks.discard)
+        count += 1
 
-    tasks = [safe_process(inquiry) for inquiry in inquiries]
-    results = await asyncio.gather(*tasks)
+    if tasks:
+        await asyncio.gather(*tasks)
 
-    return results
+    logger.info(f"Streamed batch of {count} inquiries completed in {time.time() - start_time:.2f} seconds")
+    return count
@@ -0,0 +1,270 @@
+"""
+Streaming batch inquiry uploads.
+
+An upload spooled to disk is parsed in chunks of BATCH_UPLOAD_CHUNK_ROWS rows
+(CSV with csv.reader, JSON arrays with an incremental decoder, NDJSON line by
+line). Each chunk is validated with vectorized column checks before the
+surviving rows are turned into InquiryRequest objects, and valid inquiries are
+fed to the batch pipeline while the rest of the file is still being read.
+Rejected rows, including CSV rows with the wrong number of fields, are written
+with their reasons to a CSV report for the job.
+"""
+
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from pydantic import ValidationError
+from app.config import config
+from app.schemas import InquiryRequest
+from app.services import job_store
+from app.services.batch_processor import run_batch_stream
+from app.services.history_writer import history_entry, history_writer
+from app.services.idempotency import deduplicator
+import asyncio
+import csv
+import json
+import os
+import pandas as pd
+import logging
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_FORMATS = {".csv": "csv", ".json": "json", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+JSON_READ_BYTES = 64 * 1024
+
+# Longest raw NDJSON line copied into the rejected rows report
+REJECTED_LINE_CHARS = 500
+
+_EMAIL_PATTERN = r"[^@\s]+@[^@\s]+\.[^@\s]+"
+_REQUIRED_FIELDS = [
+    (name, field.alias or name)
+    for name, field in InquiryRequest.model_fields.items()
+    if field.is_required()
+]
+
+# (row index, parsed record or the raw input that failed to parse, parse error or None)
+RawRow = Tuple[int, Optional[Any], Optional[str]]
+
+
+def upload_format(filename: str) -> Optional[str]:
+    return UPLOAD_FORMATS.get(os.path.splitext(filename.lower())[1])
+
+
+def _iter_csv(path: str) -> Iterator[RawRow]:
+    """
+    Data rows of a CSV keyed by its header. Cells stay strings, so IDs like
+    00123 survive; a row with the wrong number of fields is rejected on its own
+    instead of aborting the rest of the file.
+    """
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        reader = csv.reader(f)
+        header = next(reader, None)
+        if header is None:
+            return
+        index = 0
+        for fields in reader:
+            if not fields:
+                continue
+            if len(fields) != len(header):
+                yield index, fields, f"expected {len(header)} fields, saw {len(fields)} (line {reader.line_num})"
+            else:
+                yield index, dict(zip(header, fields)), None
+            index += 1
+
+
+def _iter_ndjson(path: str) -> Iterator[RawRow]:
+    """Records of an NDJSON file; a line that does not parse is rejected with its (truncated) text"""
+    with open(path, encoding="utf-8") as f:
+        index = 0
+        for line_num, line in enumerate(f, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield index, json.loads(line), None
+            except json.JSONDecodeError as e:
+                raw = line.rstrip("\r\n")
+                if len(raw) > REJECTED_LINE_CHARS:
+                    raw = raw[:REJECTED_LINE_CHARS] + "..."
+                yield index, raw, f"invalid JSON: {e.msg} (line {line_num})"
+            index += 1
+
+
+def _iter_json_array(path: str) -> Iterator[RawRow]:
+    """Decode the elements of a top-level JSON array one at a time"""
+    decoder = json.JSONDecoder()
+    with open(path, encoding="utf-8") as f:
+        buffer, pos, eof = "", 0, False
+
+        def fill() -> bool:
+            nonlocal buffer, pos, eof
+            chunk = f.read(JSON_READ_BYTES)
+            buffer, pos = buffer[pos:] + chunk, 0
+            eof = not chunk
+            return bool(chunk)
+
+        def skip(chars: str) -> Optional[str]:
+            """Advance past chars, reading more as needed; returns the next char or None at EOF"""
+            nonlocal pos
+            while True:
+                while pos < len(buffer) and buffer[pos] in chars:
+                    pos += 1
+                if pos < len(buffer):
+                    return buffer[pos]
+                if not fill():
+                    return None
+
+        if skip(" \t\r\n") != "[":
+            raise ValueError("expected a JSON array of inquiries")
+        pos += 1
+
+        index = 0
+        while True:
+            if skip(" \t\r\n,") in (None, "]"):
+                return
+            while True:
+                try:
+                    value, end = decoder.raw_decode(buffer, pos)
+                    break
+                except json.JSONDecodeError:
+                    if eof or not fill():
+                        raise
+            pos = end
+            yield index, value, None
+            index += 1
+
+
+def iter_upload_chunks(path: str, fmt: str, chunk_rows: int) -> Iterator[List[RawRow]]:
+    """Parsed rows of an upload, chunk_rows at a time"""
+    if fmt == "csv":
+        rows = _iter_csv(path)
+    elif fmt == "ndjson":
+        rows = _iter_ndjson(path)
+    else:
+        rows = _iter_json_array(path)
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= chunk_rows:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def validate_chunk(rows: List[RawRow]) -> Tuple[List[Tuple[int, InquiryRequest]], List[Tuple[int, Any, str]]]:
+    """Split a chunk into valid inquiries and (index, record, reason) rejections"""
+    rejected = [(index, record, error) for index, record, error in rows if error]
+    candidates = [(index, record) for index, record, error in rows if not error]
+    rejected += [(index, record, "not a JSON object") for index, record in candidates if not isinstance(record, dict)]
+    candidates = [(index, record) for index, record in candidates if isinstance(record, dict)]
+    if not candidates:
+        return [], rejected
+
+    # Vectorized pre-checks: required columns present and non-blank, email shaped
+    frame = pd.DataFrame([record for _, record in candidates])
+    reasons = pd.Series([""] * len(frame), index=frame.index)
+    for name, alias in _REQUIRED_FIELDS:
+        column = alias if alias in frame.columns else name if name in frame.columns else None
+        if column is None:
+            reasons += f"missing {alias}; "
+            continue
+        values = frame[column].astype("string").str.strip()
+        reasons += values.isna().map({True: f"missing {alias}; ", False: ""})
+        reasons += (values.fillna("x") == "").map({True: f"missing {alias}; ", False: ""})
+        if name == "email":
+            malformed = ~values.fillna("").str.fullmatch(_EMAIL_PATTERN) & values.fillna("").ne("")
+            reasons += malformed.map({True: "invalid email; ", False: ""})
+
+    valid = []
+    for position, (index, record) in enumerate(candidates):
+        reason = reasons.iat[position]
+        if reason:
+            rejected.append((index, record, reason.rstrip("; ")))
+            continue
+        try:
+            valid.append((index, InquiryRequest(**{key: _clean(value) for key, value in record.items()})))
+        except ValidationError as e:
+            details = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+            rejected.append((index, record, details))
+
+    rejected.sort(key=lambda item: item[0])
+    return valid, rejected
+
+
+def _clean(value):
+    # CSV cells arrive as strings; treat blanks in optional columns as missing
+    return None if isinstance(value, str) and not value.strip() else value
+
+
+class RejectedRowsReport:
+    """Appends rejected rows to the job's report CSV"""
+
+    def __init__(self, job_id: str):
+        self.path = job_store.rejected_report_path(job_id)
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._file = open(self.path, "w", newline="", encoding="utf-8")
+        self._writer = csv.writer(self._file)
+        self._writer.writerow(["row", "reason", "record"])
+
+    def write(self, rejected: List[Tuple[Optional[int], Any, str]]):
+        for index, record, reason in rejected:
+            self._writer.writerow(["" if index is None else index, reason, json.dumps(record, default=str)])
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+async def run_batch_upload(job_id: str, path: str, fmt: str):
+    """Parse, validate and process a spooled upload as one batch job, then remove the upload"""
+    report = RejectedRowsReport(job_id)
+    status = "completed"
+
+    def next_chunk(chunks):
+        chunk = next(chunks, None)
+        if chunk is None:
+            return None
+        valid, rejected = validate_chunk(chunk)
+        report.write(rejected)
+        job_store.add_items(job_id, len(valid), len(rejected))
+        return valid
+
+    async def inquiries():
+        nonlocal status
+        chunks = iter_upload_chunks(path, fmt, config.BATCH_UPLOAD_CHUNK_ROWS)
+        while True:
+            try:
+                valid = await asyncio.to_thread(next_chunk, chunks)
+            except Exception as e:
+                # The rest of the file cannot be read; keep what was already queued
+                logger.error(f"Batch upload {job_id} could not be parsed past this point: {e}")
+                await asyncio.to_thread(report.write, [(None, None, f"parse error: {e}")])
+                await asyncio.to_thread(job_store.add_items, job_id, 0, 1)
+                status = "failed"
+                return
+            if valid is None:
+                return
+            for item in valid:
+                yield item
+
+    async def on_complete(index: int, inquiry: InquiryRequest, result: Dict[str, Any]):
+        await asyncio.to_thread(job_store.record_result, job_id, index, result)
+        if not result.get("replayed"):
+            # Blocks while the history queue is full, pacing the batch to the writer
+            try:
+                await asyncio.to_thread(history_writer.submit, [history_entry(inquiry, result)], True)
+            except BaseException:
+                deduplicator.forget(inquiry)
+                raise
+
+    try:
+        await run_batch_stream(inquiries(), on_complete)
+    except Exception:
+        logger.exception(f"Batch job {job_id} failed")
+        status = "failed"
+    finally:
+        report.close()
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        await asyncio.to_thread(job_store.finish_job, job_id, status)
@@ -0,0 +1,161 @@
+"""
+Background dependency health probing.
+
+HealthProber checks the database, vector store, LLM API and SMTP server on a
+schedule and keeps the latest result for each. Status requests read that
+snapshot, so polling the endpoint costs nothing beyond a dict copy. Every probe
+is cheap: SELECT 1, a collection count plus a nearest-neighbour query with a
+vector already stored in the index, a model metadata lookup, and SMTP NOOP.
+"""
+
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import text
+from app.config import config
+from app.db.session import SessionLocal
+from app.db.models import InquiryHistory
+from app.core import retrieval
+from app.services.mailer import mailer
+import asyncio
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class HealthProber:
+    """Runs dependency checks in the background and caches the latest results"""
+
+    def __init__(self, interval: float, llm_interval: float, timeout: float):
+        self.interval = interval
+        self.timeout = timeout
+        self.checks: Dict[str, Callable[[], Optional[str]]] = {
+            "database": self._check_database,
+            "vectorstore": self._check_vectorstore,
+            "llm": self._check_llm,
+        }
+        if config.EMAIL_ENABLED:
+            self.checks["smtp"] = mailer.ping
+        self.intervals = {"llm": llm_interval}
+        self.results: Dict[str, Dict[str, Any]] = {}
+        self.recent_inquiries_count = 0
+        self._probe_vector = None
+        self._openai_client = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _check_database(self):
+        with SessionLocal() as db:
+            db.execute(text("SELECT 1"))
+            self.recent_inquiries_count = db.query(InquiryHistory).filter(
+                InquiryHistory.created_at >= datetime.utcnow() - timedelta(hours=1)
+            ).count()
+
+    def _check_vectorstore(self):
+        store = retrieval.vectorstore
+        if store is None:
+            return "initializing"
+        collection = store._collection
+        if collection.count() == 0:
+            return None
+        # Query with an embedding already in the index instead of embedding a probe string
+        if self._probe_vector is None:
+            sample = collection.get(limit=1, include=["embeddings"])
+            if len(sample["embeddings"]):
+                self._probe_vector = list(sample["embeddings"][0])
+        if self._probe_vector is not None:
+            collection.query(query_embeddings=[self._probe_vector], n_results=1)
+
+    def _check_llm(self):
+        if self._openai_client is None:
+            import openai
+            self._openai_client = openai.OpenAI(api_key=config.OPENAI_API_KEY, timeout=self.timeout, max_retries=0)
+        # Model metadata lookup: authenticated and reachable, but no tokens billed
+        self._openai_client.models.retrieve(config.OPENAI_MODEL)
+
+    def _due(self, name: str, now: float) -> bool:
+        previous = self.results.get(name)
+        if previous is None or previous["status"] == "initializing":
+            return True
+        return now - previous["checked_monotonic"] >= self.intervals.get(name, self.interval)
+
+    async def _probe(self, name: str, check: Callable[[], Optional[str]]):
+        previous = self.results.get(name, {})
+        start = time.perf_counter()
+        try:
+            state = await asyncio.wait_for(asyncio.to_thread(check), timeout=self.timeout)
+            status, error = state or "healthy", None
+        except Exception as e:
+            status, error = "unhealthy", str(e) or e.__class__.__name__
+            logger.warning(f"Health probe {name} failed: {error}")
+        now = datetime.utcnow().isoformat()
+        self.results[name] = {
+            "status": status,
+            "latency_ms": round((time.perf_counter() - start) * 1000, 2),
+            "last_checked": now,
+            "last_success": now if status == "healthy" else previous.get("last_success"),
+            "error": error,
+            "checked_monotonic": time.monotonic(),
+        }
+
+    async def probe_all(self, force: bool = False):
+        """Run every check that is due (or all of them when force is set) concurrently"""
+        now = time.monotonic()
+        await asyncio.gather(*(
+            self._probe(name, check)
+            for name, check in self.checks.items()
+            if force or self._due(name, now)
+        ))
+
+    async def _run(self):
+        while True:
+            try:
+                await self.probe_all()
+            except Exception as e:
+                logger.error(f"Health prober error: {e}")
+            await asyncio.sleep(self.interval)
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Latest result per dependency, without internal bookkeeping"""
+        dependencies = {
+            name: {key: value for key, value in result.items() if key != "checked_monotonic"}
+            for name, result in self.results.items()
+        }
+        statuses = [result["status"] for result in dependencies.values()]
+        if not statuses:
+            overall = "unknown"
+        elif all(status == "healthy" for status in statuses):
+            overall = "healthy"
+        elif any(status == "unhealthy" for status in statuses):
+            overall = "degraded"
+        else:
+            overall = "starting"
+        last_check = max((result["last_checked"] for result in dependencies.values()), default=None)
+        return {
+            "status": overall,
+            "dependencies": dependencies,
+            "recent_inquiries_count": self.recent_inquiries_count,
+            "last_check": last_check,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+            logger.info("Health prober started")
+
+    async def stop(self):
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        logger.info("Health prober stopped")
+
+
+health_prober = HealthProber(
+    interval=config.HEALTH_PROBE_INTERVAL,
+    llm_interval=config.HEALTH_LLM_PROBE_INTERVAL,
+    timeout=config.HEALTH_PROBE_TIMEOUT
+)
@@ -0,0 +1,198 @@
+"""
+Write-behind persistence for inquiry history.
+
+Request handlers hand finished inquiries to HistoryWriter instead of committing
+them one at a time. A background thread drains the queue and writes each batch
+- history rows, their queued reply emails and the analytics rollups - in one
+transaction on its own session, flushing once HISTORY_FLUSH_SIZE entries are
+waiting or HISTORY_FLUSH_INTERVAL seconds after the first one arrived. stop()
+drains everything still queued before returning.
+"""
+
+from typing import Any, Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
+from app.config import config
+from app.db.session import SessionLocal
+from app.db.models import InquiryHistory
+from app.schemas import InquiryRequest
+from app.services.analytics import record_inquiries
+from app.services.idempotency import request_fingerprint
+from app.services.outbox import enqueue_email
+import queue
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class HistoryBackpressure(Exception):
+    """The write-behind queue is full; the caller should shed or retry later"""
+
+
+def history_entry(request: InquiryRequest, result: Dict[str, Any]) -> Dict[str, Any]:
+    """Column values for one InquiryHistory row plus the reply email to queue with it"""
+    claims_id = result.get("status") == "success"
+    reply = None
+    if config.EMAIL_ENABLED and result.get("status") == "success" and result.get("email_body"):
+        reply = {"to": request.email, "subject": result["email_title"], "body": result["email_body"]}
+    return {
+        "record": {
+            # Only a successful run claims the (unique) inquiry_id, so failures can be retried
+            "inquiry_id": request.inquiry_id if claims_id else None,
+            "request_fingerprint": request_fingerprint(request) if claims_id else None,
+            "listing_id": request.listing_id,
+            "name": request.name,
+            "email": request.email,
+            "phone_number": request.phone_number,
+            "message": request.message,
+            "category": result.get("category"),
+            "response": result.get("response"),
+            "email_title": result.get("email_title"),
+            "email_body": result.get("email_body"),
+            "file_date": request.date,
+        },
+        "reply": reply,
+    }
+
+
+def write_entries(entries: List[Dict[str, Any]]):
+    """Insert entries, their replies and rollup counts in a single transaction"""
+    db = SessionLocal()
+    try:
+        records = [InquiryHistory(**entry["record"]) for entry in entries]
+        db.add_all(records)
+        # One multi-row INSERT for the batch; assigns the ids the outbox rows reference
+        db.flush()
+        for record, entry in zip(records, entries):
+            if entry["reply"]:
+                enqueue_email(db, inquiry_history_id=record.id, **entry["reply"])
+        record_inquiries(db, records)
+        db.commit()
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+class HistoryWriter:
+    """Bounded queue of history entries flushed in bulk by a background thread"""
+
+    def __init__(self, max_queue: int, flush_size: int, flush_interval: float, enqueue_timeout: float):
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.enqueue_timeout = enqueue_timeout
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+        self.written = 0
+        self.flushes = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="history-writer", daemon=True)
+                self._thread.start()
+                logger.info("History writer started")
+
+    def saturated(self) -> bool:
+        """True when the queue is full and new saves would block"""
+        return self._queue.full()
+
+    def submit(self, entries: List[Dict[str, Any]], block: bool = False):
+        """
+        Queue entries for the next flush. With block=False, waits at most
+        enqueue_timeout per entry and raises HistoryBackpressure if the queue
+        stays full; block=True waits as long as it takes.
+        """
+        self.start()
+        for entry in entries:
+            try:
+                self._queue.put(entry, timeout=None if block else self.enqueue_timeout)
+            except queue.Full:
+                raise HistoryBackpressure("Inquiry history queue is full")
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            write_entries(batch)
+        except Exception as e:
+            logger.error(f"Bulk history write of {len(batch)} entries failed, retrying individually: {e}")
+            for entry in batch:
+                try:
+                    write_entries([entry])
+                except IntegrityError:
+                    self.dropped += 1
+                    logger.info(f"Inquiry {entry['record']['inquiry_id']} is already recorded; skipping duplicate")
+                except Exception as item_error:
+                    self.dropped += 1
+                    logger.error(f"Dropping history entry for {entry['record']['email']}: {item_error}")
+                else:
+                    self.written += 1
+        else:
+            self.written += len(batch)
+        self.flushes += 1
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch = [first]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.flush_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                if entry is _STOP:
+                    stopping = True
+                    break
+                batch.append(entry)
+            self._flush(batch)
+
+        # Drain anything queued behind the stop marker
+        leftovers = []
+        while True:
+            try:
+                entry = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is not _STOP:
+                leftovers.append(entry)
+        for start in range(0, len(leftovers), self.flush_size):
+            self._flush(leftovers[start:start + self.flush_size])
+
+    def stop(self, timeout: Optional[float] = None):
+        """Flush everything queued so far, then stop the writer thread"""
+        with self._lock:
+            thread = self._thread
+            self._thread = None
+        if thread is None or not thread.is_alive():
+            return
+        self._queue.put(_STOP)
+        thread.join(timeout)
+        logger.info(f"History writer stopped after {self.written} rows in {self.flushes} flushes")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "written": self.written,
+            "flushes": self.flushes,
+            "dropped": self.dropped,
+        }
+
+
+history_writer = HistoryWriter(
+    max_queue=config.HISTORY_QUEUE_SIZE,
+    flush_size=config.HISTORY_FLUSH_SIZE,
+    flush_interval=config.HISTORY_FLUSH_INTERVAL,
+    enqueue_timeout=config.HISTORY_ENQUEUE_TIMEOUT
+)
@@ -0,0 +1,186 @@
+"""
+Idempotent inquiry processing keyed on Inquiry ID.
+
+A retried POST or a re-uploaded batch must not pay for the pipeline again or
+send the customer a second email. process_once() returns the stored result for
+an inquiry_id that already completed: first from a recent-results cache that
+covers the write-behind window, then from inquiry_history, where the id has a
+unique index. A duplicate that arrives while the original is still running
+waits for that run instead of starting its own. Replayed results carry
+replayed=True so callers skip persisting them again; a caller that cannot
+hand a fresh result to the history writer must forget() it.
+
+Only a request identical to the original (same email, listing and message, as
+compared by request_fingerprint) is replayed; reusing an inquiry_id for a
+different request raises InquiryConflict.
+"""
+
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from app.config import config
+from app.db.session import SessionLocal
+from app.db.models import InquiryHistory
+from app.schemas import InquiryRequest
+from app.services.processor import aprocess_inquiry
+import asyncio
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class InquiryConflict(Exception):
+    """The inquiry_id was already used for a different request"""
+
+
+def _fingerprint(email: Optional[str], listing_id: Optional[str], message: Optional[str]) -> str:
+    parts = [(email or "").strip().lower(), (listing_id or "").strip(), (message or "").strip()]
+    return hashlib.sha256("\x1f".join(parts).encode("utf-8")).hexdigest()
+
+
+def request_fingerprint(request: InquiryRequest) -> str:
+    """Hash of the fields that make two requests with one inquiry_id the same inquiry"""
+    return _fingerprint(request.email, request.listing_id, request.message)
+
+
+class InquiryDeduplicator:
+    """Coalesces concurrent and repeated processing of the same inquiry_id"""
+
+    def __init__(self, max_recent: int):
+        self.max_recent = max_recent
+        # inquiry_id -> (request fingerprint, result or running future)
+        self._recent: "OrderedDict[str, Tuple[str, Dict[str, Any]]]" = OrderedDict()
+        self._inflight: Dict[str, Tuple[str, asyncio.Future]] = {}
+        self._lock = threading.Lock()
+        self.replays = 0
+        self.coalesced = 0
+
+    def _remember(self, inquiry_id: str, fingerprint: str, result: Dict[str, Any]):
+        with self._lock:
+            self._recent[inquiry_id] = (fingerprint, result)
+            self._recent.move_to_end(inquiry_id)
+            while len(self._recent) > self.max_recent:
+                self._recent.popitem(last=False)
+
+    def _recent_result(self, inquiry_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        with self._lock:
+            entry = self._recent.get(inquiry_id)
+            if entry is not None:
+                self._recent.move_to_end(inquiry_id)
+            return entry
+
+    @staticmethod
+    def _stored_result(inquiry_id: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+        db = SessionLocal()
+        try:
+            row = db.query(InquiryHistory).filter(InquiryHistory.inquiry_id == inquiry_id).first()
+            if row is None:
+                return None
+            # Rows saved before fingerprints were stored are fingerprinted from their columns
+            fingerprint = row.request_fingerprint or _fingerprint(row.email, row.listing_id, row.message)
+            return fingerprint, {
+                "email": row.email,
+                "category": row.category,
+                "response": row.response,
+                "email_title": row.email_title,
+                "email_body": row.email_body,
+                "status": "success",
+            }
+        finally:
+            db.close()
+
+    @staticmethod
+    def _check_fingerprint(inquiry_id: str, fingerprint: str, expected: str):
+        if fingerprint != expected:
+            raise InquiryConflict(f"Inquiry ID {inquiry_id} was already used for a different inquiry")
+
+    async def replay(self, request: InquiryRequest) -> Optional[Dict[str, Any]]:
+        """
+        The result for an inquiry_id that already completed (or that is running,
+        once it finishes), marked replayed=True; None if the caller should run it.
+        Raises InquiryConflict if the inquiry_id belongs to a different request.
+        Call begin() right after a None without awaiting in between.
+        """
+        inquiry_id = request.inquiry_id
+        if not inquiry_id:
+            return None
+        fingerprint = request_fingerprint(request)
+
+        stored = self._recent_result(inquiry_id)
+        if stored is None:
+            running = self._inflight.get(inquiry_id)
+            if running is None:
+                stored = await asyncio.to_thread(self._stored_result, inquiry_id)
+                # A concurrent duplicate may have started while we looked in the database
+                running = self._inflight.get(inquiry_id)
+            if stored is None and running is not None:
+                self._check_fingerprint(inquiry_id, fingerprint, running[0])
+                self.coalesced += 1
+                logger.info(f"Inquiry {inquiry_id} is already being processed; waiting for it")
+                return {**await asyncio.shield(running[1]), "replayed": True}
+
+        if stored is None:
+            return None
+        self._check_fingerprint(inquiry_id, fingerprint, stored[0])
+        self.replays += 1
+        logger.info(f"Inquiry {inquiry_id} was already processed; returning the stored result")
+        return {**stored[1], "replayed": True}
+
+    def begin(self, request: InquiryRequest) -> Optional[asyncio.Future]:
+        """Register a run so duplicates arriving meanwhile wait for it"""
+        if not request.inquiry_id:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[request.inquiry_id] = (request_fingerprint(request), future)
+        return future
+
+    def complete(self, request: InquiryRequest, future: Optional[asyncio.Future], result: Dict[str, Any]):
+        if future is None:
+            return
+        self._inflight.pop(request.inquiry_id, None)
+        future.set_result(result)
+        # Failed runs are not remembered, so a retry gets a fresh attempt
+        if result.get("status") == "success":
+            self._remember(request.inquiry_id, request_fingerprint(request), result)
+
+    def forget(self, request: InquiryRequest):
+        """Drop a remembered result that could not be saved, so a retry runs again"""
+        if not request.inquiry_id:
+            return
+        with self._lock:
+            self._recent.pop(request.inquiry_id, None)
+
+    def fail(self, request: InquiryRequest, future: Optional[asyncio.Future], error: BaseException):
+        if future is None:
+            return
+        self._inflight.pop(request.inquiry_id, None)
+        if not future.done():
+            future.set_exception(error if isinstance(error, Exception) else RuntimeError("Original inquiry run was cancelled"))
+            future.exception()  # Mark retrieved when no duplicate is waiting
+
+    async def process_once(self, request: InquiryRequest) -> Dict[str, Any]:
+        """aprocess_inquiry, unless this inquiry_id already ran or is running"""
+        replayed = await self.replay(request)
+        if replayed is not None:
+            return replayed
+
+        future = self.begin(request)
+        try:
+            result = await aprocess_inquiry(request)
+        except BaseException as e:
+            self.fail(request, future, e)
+            raise
+        self.complete(request, future, result)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "in_flight": len(self._inflight),
+            "recent": len(self._recent),
+            "replays": self.replays,
+            "coalesced": self.coalesced,
+        }
+
+
+deduplicator = InquiryDeduplicator(max_recent=config.IDEMPOTENCY_CACHE_SIZE)
@@ -0,0 +1,258 @@
+from typing import List, Dict, Any, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+from langchain_core.documents import Document
+from more_itertools import chunked
+from app.config import config
+from app.core.lexical_index import get_lexical_index, save_lexical_index
+from app.core.rate_limit import with_retries_sync
+from app.core.listing_store import ListingTableBuilder
+from app.core.retrieval import invalidate_listing_facets, bump_index_generation
+from app.services.response_cache import response_cache
+from app.utils.document_builder import build_documents_from_csv, infer_types, iter_frames_from_csv, make_document_id
+import logging
+import os
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+# Chroma max batch size is ~5461
+BATCH_SIZE = 5000
+
+# In-memory ingestion job tracker
+ingestion_jobs: Dict[str, Dict[str, Any]] = {}
+
+_SENTINEL = object()
+
+
+def _listing_key(document_id: str) -> str:
+    """Listing portion of a document ID produced by make_document_id"""
+    return document_id.rsplit(":", 1)[0]
+
+
+def on_index_changed():
+    """Drop state derived from the listing index after it is modified"""
+    # Cached responses may cite listings that just changed
+    response_cache.invalidate()
+    bump_index_generation()
+    invalidate_listing_facets()
+    save_lexical_index()
+
+
+def get_stored_ids(vectorstore) -> Dict[str, set]:
+    """Map listing key -> set of document IDs currently stored in the vectorstore"""
+    stored = defaultdict(set)
+    # Only IDs are needed for the diff, so skip documents and embeddings
+    for document_id in vectorstore.get(include=[])["ids"]:
+        stored[_listing_key(document_id)].add(document_id)
+    return stored
+
+
+class ListingSync:
+    """
+    Incremental diff of a listing feed against the IDs already in the vectorstore.
+
+    Documents carry deterministic IDs, so plan() only returns chunks that are not
+    stored yet; finish() returns chunks that are no longer in the feed and the
+    per-listing added/updated/deleted/unchanged counts.
+    """
+
+    def __init__(self, stored: Dict[str, set]):
+        self.stored = stored
+        self.seen: Dict[str, set] = defaultdict(set)
+
+    def plan(self, documents: List[Document]) -> Dict[str, Document]:
+        """Return the documents in this batch that must be written, keyed by ID"""
+        to_add = {}
+        for document in documents:
+            document_id = make_document_id(document)
+            listing = _listing_key(document_id)
+            if document_id in self.seen[listing]:
+                continue
+            self.seen[listing].add(document_id)
+            if document_id not in self.stored.get(listing, ()):
+                to_add[document_id] = document
+        return to_add
+
+    def finish(self, prune: bool = True) -> Tuple[List[str], Dict[str, int]]:
+        """Return stale document IDs to delete and the listing-level counts"""
+        counts = {"added": 0, "updated": 0, "deleted": 0, "unchanged": 0}
+        to_delete = []
+
+        for listing, wanted in self.seen.items():
+            existing = self.stored.get(listing, set())
+            if not existing:
+                counts["added"] += 1
+            elif existing == wanted:
+                counts["unchanged"] += 1
+            else:
+                counts["updated"] += 1
+                to_delete.extend(existing - wanted)
+
+        if prune:
+            for listing in self.stored.keys() - self.seen.keys():
+                counts["deleted"] += 1
+                to_delete.extend(self.stored[listing])
+
+        return to_delete, counts
+
+
+def purge_finished_jobs():
+    """Drop tracker entries for jobs that finished more than INGEST_JOB_TTL_HOURS ago"""
+    cutoff = datetime.utcnow() - timedelta(hours=config.INGEST_JOB_TTL_HOURS)
+    expired = [
+        job_id for job_id, job in list(ingestion_jobs.items())
+        if job["finished_at"] and datetime.fromisoformat(job["finished_at"]) < cutoff
+    ]
+    for job_id in expired:
+        ingestion_jobs.pop(job_id, None)
+    if expired:
+        logger.info(f"Evicted {len(expired)} finished ingestion jobs")
+
+
+def create_ingestion_job(job_id: str, source: str) -> Dict[str, Any]:
+    """Register a new ingestion job in the tracker and evict expired ones"""
+    purge_finished_jobs()
+    ingestion_jobs[job_id] = {
+        "job_id": job_id,
+        "source": source,
+        "status": "queued",
+        "batches": 0,
+        "chunks_parsed": 0,
+        "chunks_embedded": 0,
+        "chunks_written": 0,
+        "chunks_deleted": 0,
+        "stage_seconds": {"parse": 0.0, "embed": 0.0, "write": 0.0},
+        "elapsed_seconds": 0.0,
+        "started_at": None,
+        "finished_at": None,
+        "error": None,
+    }
+    return ingestion_jobs[job_id]
+
+
+def run_ingestion_job(job_id: str, csv_path: str, vectorstore, prune: bool = True, cleanup: bool = False):
+    """
+    Ingest a listings CSV as a three-stage pipeline.
+
+    Parsing, embedding and vectorstore writes run in separate threads connected by
+    bounded queues, so embedding batch N+1 overlaps with writing batch N and the
+    total wall-clock approaches the cost of the slowest stage.
+    """
+    job = ingestion_jobs[job_id]
+    job["status"] = "in_progress"
+    job["started_at"] = datetime.utcnow().isoformat()
+    start_time = time.time()
+
+    embed_queue = queue.Queue(maxsize=config.INGEST_QUEUE_DEPTH)
+    write_queue = queue.Queue(maxsize=config.INGEST_QUEUE_DEPTH)
+    errors = []
+    lexical_index = get_lexical_index(vectorstore)
+    sync = ListingSync(get_stored_ids(vectorstore))
+    # Exact-attribute table for structured lookups, upserted as the feed is parsed
+    table = ListingTableBuilder(replace=prune)
+
+    def parse_stage():
+        try:
+            frames = iter_frames_from_csv(csv_path, rows_per_batch=config.INGEST_BATCH_ROWS)
+            while not errors:
+                stage_start = time.time()
+                frame = next(frames, None)
+                if frame is None:
+                    break
+                table.upsert(frame)
+                documents = build_documents_from_csv(infer_types(frame))
+                to_add = sync.plan(documents)
+                job["stage_seconds"]["parse"] += time.time() - stage_start
+                job["batches"] += 1
+                job["chunks_parsed"] += len(documents)
+                embed_queue.put(to_add)
+        except Exception as e:
+            errors.append(e)
+        finally:
+            embed_queue.put(_SENTINEL)
+
+    def embed_stage():
+        # Keep draining after a failure so the parser never blocks on a full queue
+        for to_add in iter(embed_queue.get, _SENTINEL):
+            if errors:
+                continue
+            try:
+                stage_start = time.time()
+                ids = list(to_add)
+                texts = [document.page_content for document in to_add.values()]
+                embeddings = with_retries_sync(vectorstore.embeddings.embed_documents, texts) if texts else []
+                job["stage_seconds"]["embed"] += time.time() - stage_start
+                job["chunks_embedded"] += len(ids)
+                write_queue.put((ids, list(to_add.values()), embeddings))
+            except Exception as e:
+                errors.append(e)
+        write_queue.put(_SENTINEL)
+
+    threads = [
+        threading.Thread(target=parse_stage, name=f"ingest-parse-{job_id}", daemon=True),
+        threading.Thread(target=embed_stage, name=f"ingest-embed-{job_id}", daemon=True),
+    ]
+    for thread in threads:
+        thread.start()
+
+    try:
+        # Write stage runs on the job thread
+        for ids, documents, embeddings in iter(write_queue.get, _SENTINEL):
+            if errors:
+                continue
+            try:
+                stage_start = time.time()
+                for start in range(0, len(ids), BATCH_SIZE):
+                    end = start + BATCH_SIZE
+                    # Embeddings are precomputed, so write straight to the collection
+                    vectorstore._collection.upsert(
+                        ids=ids[start:end],
+                        embeddings=embeddings[start:end],
+                        documents=[document.page_content for document in documents[start:end]],
+                        metadatas=[document.metadata for document in documents[start:end]],
+                    )
+                lexical_index.add_documents(ids, documents)
+                job["stage_seconds"]["write"] += time.time() - stage_start
+                job["chunks_written"] += len(ids)
+            except Exception as e:
+                errors.append(e)
+
+        for thread in threads:
+            thread.join()
+
+        if errors:
+            raise errors[0]
+
+        to_delete, counts = sync.finish(prune)
+        for batch in chunked(to_delete, BATCH_SIZE):
+            vectorstore.delete(ids=list(batch))
+            lexical_index.remove_many(batch)
+            job["chunks_deleted"] += len(batch)
+
+        table.publish()
+
+        job.update(counts)
+        job["status"] = "completed"
+        logger.info(
+            f"Ingestion job {job_id} completed: {counts['added']} added, {counts['updated']} updated, "
+            f"{counts['deleted']} deleted, {counts['unchanged']} unchanged"
+        )
+
+    except Exception as e:
+        logger.exception(f"Ingestion job {job_id} failed")
+        job["status"] = "failed"
+        job["error"] = str(e)
+
+    finally:
+        if job["chunks_written"] or job["chunks_deleted"]:
+            on_index_changed()
+        job["elapsed_seconds"] = round(time.time() - start_time, 3)
+        job["finished_at"] = datetime.utcnow().isoformat()
+        if cleanup:
+            try:
+                os.remove(csv_path)
+            except OSError:
+                logger.warning(f"Could not remove spooled upload {csv_path}")
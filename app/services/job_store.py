@@ -0,0 +1,138 @@
+from typing import Any, Dict, List, Optional
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app.config import config
+from app.db.session import SessionLocal
+from app.db.models import BatchJob, BatchJobResult
+import logging
+import os
+import uuid
+
+logger = logging.getLogger(__name__)
+
+
+def create_job(total: int) -> str:
+    """Create a batch job row and evict expired jobs"""
+    purge_expired_jobs()
+    job_id = str(uuid.uuid4())
+    db = SessionLocal()
+    try:
+        db.add(BatchJob(id=job_id, status="in_progress", total=total))
+        db.commit()
+    finally:
+        db.close()
+    return job_id
+
+
+def add_items(job_id: str, accepted: int, rejected: int = 0):
+    """Grow a streaming job's total as its upload is parsed"""
+    db = SessionLocal()
+    try:
+        db.query(BatchJob).filter(BatchJob.id == job_id).update({
+            BatchJob.total: BatchJob.total + accepted,
+            BatchJob.rejected: BatchJob.rejected + rejected,
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def rejected_report_path(job_id: str) -> str:
+    """CSV of upload rows rejected by validation, with the reason for each"""
+    return os.path.join(config.INGEST_UPLOAD_DIR, f"{job_id}.rejected.csv")
+
+
+def record_result(job_id: str, index: int, result: Dict[str, Any]):
+    """Store one item result and bump the job counters in the same transaction"""
+    succeeded = result.get("status") == "success"
+    db = SessionLocal()
+    try:
+        db.add(BatchJobResult(
+            job_id=job_id,
+            item_index=index,
+            email=result.get("email"),
+            category=result.get("category"),
+            response=result.get("response"),
+            status=result.get("status"),
+            error=result.get("error")
+        ))
+        # Increment in SQL so out-of-order completions never lose updates
+        db.query(BatchJob).filter(BatchJob.id == job_id).update({
+            BatchJob.progress: BatchJob.progress + 1,
+            BatchJob.succeeded: BatchJob.succeeded + (1 if succeeded else 0),
+            BatchJob.failed: BatchJob.failed + (0 if succeeded else 1),
+        }, synchronize_session=False)
+        db.commit()
+    except Exception as e:
+        logger.error(f"Failed to record result {index} for job {job_id}: {e}")
+        db.rollback()
+    finally:
+        db.close()
+
+
+def finish_job(job_id: str, status: str = "completed"):
+    db = SessionLocal()
+    try:
+        db.query(BatchJob).filter(BatchJob.id == job_id).update(
+            {BatchJob.status: status, BatchJob.completed_at: datetime.utcnow()},
+            synchronize_session=False
+        )
+        db.commit()
+    finally:
+        db.close()
+
+
+def get_job(job_id: str) -> Optional[BatchJob]:
+    db = SessionLocal()
+    try:
+        return db.query(BatchJob).filter(BatchJob.id == job_id).first()
+    finally:
+        db.close()
+
+
+def list_jobs(limit: int = 100) -> List[BatchJob]:
+    db = SessionLocal()
+    try:
+        return db.query(BatchJob).order_by(BatchJob.created_at.desc()).limit(limit).all()
+    finally:
+        db.close()
+
+
+def get_results(job_id: str, after: int = -1, limit: int = 100) -> List[BatchJobResult]:
+    """Results for a job ordered by item index, starting after the given index"""
+    db = SessionLocal()
+    try:
+        return db.query(BatchJobResult).filter(
+            BatchJobResult.job_id == job_id,
+            BatchJobResult.item_index > after
+        ).order_by(BatchJobResult.item_index).limit(limit).all()
+    finally:
+        db.close()
+
+
+def purge_expired_jobs():
+    """Delete finished jobs (and their results) completed more than BATCH_JOB_TTL_HOURS ago"""
+    cutoff = datetime.utcnow() - timedelta(hours=config.BATCH_JOB_TTL_HOURS)
+    db = SessionLocal()
+    try:
+        # Jobs still running have no completed_at, so long uploads are never purged mid-run
+        expired = db.execute(
+            select(BatchJob.id).where(BatchJob.completed_at < cutoff)
+        ).scalars().all()
+        for job_id in expired:
+            try:
+                os.remove(rejected_report_path(job_id))
+            except FileNotFoundError:
+                pass
+        removed = db.query(BatchJobResult).filter(
+            BatchJobResult.job_id.in_(expired)
+        ).delete(synchronize_session=False)
+        jobs = db.query(BatchJob).filter(BatchJob.id.in_(expired)).delete(synchronize_session=False)
+        db.commit()
+        if jobs:
+            logger.info(f"Evicted {jobs} expired batch jobs ({removed} results)")
+    except Exception as e:
+        logger.error(f"Failed to purge expired batch jobs: {e}")
+        db.rollback()
+    finally:
+        db.close()
@@ -0,0 +1,188 @@
+from contextlib import contextmanager
+from email.message import EmailMessage
+from email.utils import formataddr
+from typing import Iterable, List, Optional, Tuple
+from app.config import config
+import asyncio
+import queue
+import smtplib
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def build_message(to: str, subject: str, body: str) -> EmailMessage:
+    """Build a plain-text message from the configured sender"""
+    msg = EmailMessage()
+    msg["Subject"] = subject
+    msg["From"] = formataddr((config.EMAIL_FROM_NAME, config.EMAIL_FROM_ADDRESS))
+    msg["To"] = to
+    msg.set_content(body, charset="utf-8")
+    return msg
+
+
+class SMTPConnectionPool:
+    """
+    Bounded pool of logged-in SMTP sessions.
+
+    Connections are reused across messages so STARTTLS and login happen once per
+    session rather than once per email. A connection idle for longer than
+    health_check_after seconds is probed with NOOP before reuse and replaced if
+    the server has dropped it.
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: Optional[str] = None,
+        password: Optional[str] = None,
+        starttls: bool = True,
+        size: int = 4,
+        timeout: float = 30.0,
+        health_check_after: float = 30.0
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.timeout = timeout
+        self.health_check_after = health_check_after
+        self._idle: "queue.LifoQueue[Tuple[smtplib.SMTP, float]]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(size)
+
+    def _connect(self) -> smtplib.SMTP:
+        conn = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        if self.starttls:
+            conn.starttls()
+        if self.username and self.password:
+            conn.login(self.username, self.password)
+        logger.debug(f"Opened SMTP session to {self.host}:{self.port}")
+        return conn
+
+    def _healthy(self, conn: smtplib.SMTP, last_used: float) -> bool:
+        if time.monotonic() - last_used < self.health_check_after:
+            return True
+        try:
+            return conn.noop()[0] == 250
+        except (smtplib.SMTPException, OSError):
+            return False
+
+    @staticmethod
+    def _discard(conn: smtplib.SMTP):
+        try:
+            conn.quit()
+        except (smtplib.SMTPException, OSError):
+            conn.close()
+
+    def _checkout(self) -> smtplib.SMTP:
+        while True:
+            try:
+                conn, last_used = self._idle.get_nowait()
+            except queue.Empty:
+                return self._connect()
+            if self._healthy(conn, last_used):
+                return conn
+            self._discard(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection; it is discarded instead of returned if sending fails"""
+        if not self._slots.acquire(timeout=self.timeout):
+            raise TimeoutError("Timed out waiting for an SMTP connection")
+        conn = None
+        try:
+            conn = self._checkout()
+            yield conn
+        except Exception:
+            if conn is not None:
+                self._discard(conn)
+                conn = None
+            raise
+        finally:
+            if conn is not None:
+                self._idle.put((conn, time.monotonic()))
+            self._slots.release()
+
+    def close(self):
+        """Close every idle connection"""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                return
+            self._discard(conn)
+
+
+class Mailer:
+    """Direct SMTP sender backed by a connection pool, with sync and async APIs"""
+
+    def __init__(self, pool: SMTPConnectionPool):
+        self.pool = pool
+
+    def send_many(self, messages: Iterable[EmailMessage]) -> List[Optional[Exception]]:
+        """
+        Send messages over a single pooled session, reconnecting once on disconnect.
+
+        Returns one entry per message: None if it was sent, or the error the
+        server gave for it. A refused recipient or rejected message does not
+        stop the rest of the batch; the session is reset and reused. If the
+        session drops again after the reconnect, the messages not yet sent
+        get that error and the results so far are still returned.
+        """
+        messages = list(messages)
+        results: List[Optional[Exception]] = []
+        for attempt in range(2):
+            try:
+                with self.pool.connection() as conn:
+                    while len(results) < len(messages):
+                        try:
+                            conn.send_message(messages[len(results)])
+                            results.append(None)
+                        except (smtplib.SMTPRecipientsRefused, smtplib.SMTPResponseException) as e:
+                            # smtplib has already sent RSET, so the session can carry on
+                            results.append(e)
+                break
+            except (smtplib.SMTPServerDisconnected, ConnectionError) as e:
+                if attempt:
+                    logger.error(f"SMTP session dropped again, {len(messages) - len(results)} messages not sent: {e}")
+                    results.extend([e] * (len(messages) - len(results)))
+                    break
+                logger.warning("SMTP session dropped, retrying on a fresh connection")
+        return results
+
+    def send(self, to: str, subject: str, body: str):
+        error = self.send_many([build_message(to, subject, body)])[0]
+        if error is not None:
+            raise error
+        logger.info(f"Email sent to {to}")
+
+    async def asend(self, to: str, subject: str, body: str):
+        await asyncio.to_thread(self.send, to, subject, body)
+
+    async def asend_many(self, messages: List[EmailMessage]) -> List[Optional[Exception]]:
+        return await asyncio.to_thread(self.send_many, messages)
+
+    def ping(self):
+        """NOOP on a pooled session; raises if the server is unreachable or refuses"""
+        with self.pool.connection() as conn:
+            code = conn.noop()[0]
+            if code != 250:
+                raise smtplib.SMTPResponseException(code, b"NOOP failed")
+
+    def close(self):
+        self.pool.close()
+
+
+mailer = Mailer(SMTPConnectionPool(
+    host=config.SMTP_HOST,
+    port=config.SMTP_PORT,
+    username=config.SMTP_USERNAME,
+    password=config.SMTP_PASSWORD,
+    starttls=config.SMTP_STARTTLS,
+    size=config.SMTP_POOL_SIZE,
+    timeout=config.SMTP_TIMEOUT
+))
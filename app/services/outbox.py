@@ -0,0 +1,190 @@
+"""
+Transactional email outbox.
+
+Reply emails are inserted into email_outbox in the same transaction as their
+InquiryHistory row; OutboxDispatcher drains due rows in the background,
+sending each claimed batch as up to OUTBOX_CONCURRENCY runs of messages over
+pooled SMTP sessions and retrying failures with exponential backoff. A claim
+that outlives OUTBOX_CLAIM_LEASE is presumed to belong to a dead dispatcher
+and is returned to the queue.
+"""
+
+from datetime import datetime, timedelta
+from typing import List, Optional
+from sqlalchemy.orm import Session
+from app.config import config
+from app.db.session import SessionLocal
+from app.db.models import EmailOutbox
+from app.services.mailer import build_message, mailer
+import asyncio
+import random
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def enqueue_email(db_session: Session, to: str, subject: str, body: str, inquiry_history_id: Optional[int] = None):
+    """Add a reply to the outbox; committed together with the caller's transaction"""
+    db_session.add(EmailOutbox(
+        inquiry_history_id=inquiry_history_id,
+        recipient=to,
+        subject=subject,
+        body=body,
+        status="pending",
+        next_attempt_at=datetime.utcnow()
+    ))
+
+
+def _claim_due(limit: int) -> List[EmailOutbox]:
+    """Mark up to limit due rows as sending and return them"""
+    db = SessionLocal()
+    try:
+        now = datetime.utcnow()
+        candidates = db.query(EmailOutbox.id).filter(
+            EmailOutbox.status == "pending",
+            EmailOutbox.next_attempt_at <= now
+        ).order_by(EmailOutbox.next_attempt_at).limit(limit).all()
+
+        claimed_ids = []
+        for (outbox_id,) in candidates:
+            # Conditional update so concurrent dispatchers never claim the same row
+            claimed = db.query(EmailOutbox).filter(
+                EmailOutbox.id == outbox_id,
+                EmailOutbox.status == "pending"
+            ).update({EmailOutbox.status: "sending", EmailOutbox.claimed_at: now}, synchronize_session=False)
+            if claimed:
+                claimed_ids.append(outbox_id)
+        db.commit()
+
+        if not claimed_ids:
+            return []
+        rows = db.query(EmailOutbox).filter(EmailOutbox.id.in_(claimed_ids)).all()
+        db.expunge_all()
+        return rows
+    finally:
+        db.close()
+
+
+def _mark_sent(outbox_ids: List[int]):
+    db = SessionLocal()
+    try:
+        db.query(EmailOutbox).filter(EmailOutbox.id.in_(outbox_ids)).update({
+            EmailOutbox.status: "sent",
+            EmailOutbox.attempts: EmailOutbox.attempts + 1,
+            EmailOutbox.sent_at: datetime.utcnow(),
+            EmailOutbox.last_error: None
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _mark_failed(outbox_id: int, attempts: int, error: str):
+    """Schedule a retry with jittered exponential backoff, or give up after OUTBOX_MAX_ATTEMPTS"""
+    exhausted = attempts >= config.OUTBOX_MAX_ATTEMPTS
+    delay = min(config.OUTBOX_RETRY_MAX_DELAY, config.OUTBOX_RETRY_BASE_DELAY * 2 ** (attempts - 1))
+    db = SessionLocal()
+    try:
+        db.query(EmailOutbox).filter(EmailOutbox.id == outbox_id).update({
+            EmailOutbox.status: "failed" if exhausted else "pending",
+            EmailOutbox.attempts: attempts,
+            EmailOutbox.last_error: error,
+            EmailOutbox.next_attempt_at: datetime.utcnow() + timedelta(seconds=random.uniform(delay / 2, delay))
+        }, synchronize_session=False)
+        db.commit()
+    finally:
+        db.close()
+
+
+def release_stale_claims(lease: float):
+    """Return rows claimed more than lease seconds ago (by a crashed process) to the queue"""
+    cutoff = datetime.utcnow() - timedelta(seconds=lease)
+    db = SessionLocal()
+    try:
+        released = db.query(EmailOutbox).filter(
+            EmailOutbox.status == "sending",
+            (EmailOutbox.claimed_at < cutoff) | EmailOutbox.claimed_at.is_(None)
+        ).update({EmailOutbox.status: "pending", EmailOutbox.claimed_at: None}, synchronize_session=False)
+        db.commit()
+        if released:
+            logger.info(f"Released {released} stale outbox claims")
+    finally:
+        db.close()
+
+
+class OutboxDispatcher:
+    """Background task that drains the outbox over at most OUTBOX_CONCURRENCY SMTP sessions at a time"""
+
+    def __init__(self, concurrency: int, batch_size: int, poll_interval: float, claim_lease: float):
+        self.concurrency = concurrency
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.claim_lease = claim_lease
+        self._task: Optional[asyncio.Task] = None
+        self._stopping = False
+
+    async def _fail(self, row: EmailOutbox, error: Exception):
+        logger.warning(f"Outbox delivery {row.id} to {row.recipient} failed: {error}")
+        await asyncio.to_thread(_mark_failed, row.id, row.attempts + 1, str(error))
+
+    async def _deliver(self, rows: List[EmailOutbox]):
+        """Send rows over one pooled session and record each outcome"""
+        try:
+            messages = [build_message(row.recipient, row.subject, row.body) for row in rows]
+            errors = await mailer.asend_many(messages)
+        except Exception as e:
+            # The batch failed to build or the pool could not connect, so nothing was sent
+            for row in rows:
+                await self._fail(row, e)
+            return
+
+        # send_many reports each message separately, including those cut off by a dropped session
+        sent = [row.id for row, error in zip(rows, errors) if error is None]
+        if sent:
+            await asyncio.to_thread(_mark_sent, sent)
+        for row, error in zip(rows, errors):
+            if error is not None:
+                await self._fail(row, error)
+
+    async def _run(self):
+        released_at = 0.0
+        while not self._stopping:
+            try:
+                # Claims older than the lease belong to a dispatcher that died mid-send
+                if time.monotonic() - released_at >= self.claim_lease:
+                    await asyncio.to_thread(release_stale_claims, self.claim_lease)
+                    released_at = time.monotonic()
+
+                rows = await asyncio.to_thread(_claim_due, self.batch_size)
+                if rows:
+                    # Split the batch into one run of messages per concurrent session
+                    runs = max(1, min(self.concurrency, len(rows)))
+                    await asyncio.gather(*(self._deliver(rows[i::runs]) for i in range(runs)))
+                    continue
+            except Exception as e:
+                logger.error(f"Outbox dispatcher error: {e}")
+            await asyncio.sleep(self.poll_interval)
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+            logger.info("Email outbox dispatcher started")
+
+    async def stop(self):
+        """Finish the in-flight batch, then stop"""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._task
+        self._task = None
+        logger.info("Email outbox dispatcher stopped")
+
+
+outbox_dispatcher = OutboxDispatcher(
+    concurrency=config.OUTBOX_CONCURRENCY,
+    batch_size=config.OUTBOX_BATCH_SIZE,
+    poll_interval=config.OUTBOX_POLL_INTERVAL,
+    claim_lease=config.OUTBOX_CLAIM_LEASE
+)
@@ -1,90 +1,275 @@
-from app.core.retrieval import get_retriever
-from app.core.llm import llm, category_chain, expand_chain, category_prompts, parser
-from app.services.email import send_email_via_agent
+from app.core import retrieval
+from app.core.retrieval import aretrieve_listings
+from app.core.listing_store import structured_context
+from app.core.llm import (
+    get_llm, get_category_chain, get_expand_chain, parser, category_prompts, category_prompt, expand_prompt
+)
+from app.core.classifier import classify_locally, normalize_category
+from app.core.rate_limit import limited_call, limited_stream, with_retries, estimate_tokens
+from app.services.response_cache import response_cache
 from app.config import config
-from langchain.schema.runnable import RunnableMap, RunnablePassthrough
 from app.schemas import InquiryRequest
+from typing import Any, AsyncIterator, Dict
+import asyncio
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Ceiling on inquiries in flight through the async pipeline
+inquiry_semaphore = asyncio.Semaphore(config.MAX_CONCURRENT_INQUIRIES)
 
-def process_inquiry(request: InquiryRequest) -> dict:
-    """Process a real estate inquiry end-to-end"""
+FAILURE_RESPONSE = (
+    "We're currently unable to process your request. "
+    "Please contact support or try again later."
+)
 
+UNEXPECTED_ERROR_RESPONSE = (
+    "An unexpected error occurred while processing your inquiry. "
+    "Please try again later or contact support."
+)
+
+
+async def _atimed(timings: dict, stage: str, coro):
+    """Await a stage and record its wall-clock duration in milliseconds"""
+    start = time.perf_counter()
     try:
-        raw_query = request.message
-        logger.info(f"Processing inquiry from {request.email}")
+        return await coro
+    finally:
+        timings[stage] = round((time.perf_counter() - start) * 1000, 2)
 
-        # Step 1: Expand the inquiry message
-        try:
-            expanded = expand_chain.invoke({"message": raw_query})
-            logger.debug(f"Expanded query: {expanded}")
-        except Exception as e:
-            logger.warning(f"Query expansion failed: {e}, using raw query")
-            expanded = raw_query
 
-        # Step 2: Categorize the inquiry
-        try:
-            category = category_chain.invoke({"message": raw_query}).strip()
-            logger.info(f"Inquiry categorized as: {category}")
-        except Exception as e:
-            logger.error(f"Inquiry categorization failed: {e}")
-            category = "General Inquiry"
+def _start_cache_lookup(timings: dict, raw_query: str):
+    """Embed the message for the response cache in the background, if the cache is on"""
+    if not config.RESPONSE_CACHE_ENABLED:
+        return None
+    return asyncio.create_task(
+        _atimed(timings, "cache_lookup", with_retries(retrieval.get_embeddings().aembed_query, raw_query))
+    )
 
-        # Step 3: Generate a response using RAG
-        try:
-            retriever = get_retriever()
-            response_chain = (
-                RunnableMap({
-                    "context": retriever,
-                    "question": RunnablePassthrough()
-                }) |
-                category_prompts.get(category, category_prompts["General Inquiry"]) |
-                llm |
-                parser
-            )
-            response = response_chain.invoke(expanded)
-            logger.info("Successfully generated response via RAG")
-            status = "success"
-
-            # Step 4: Email the response ONLY if status is success and email is enabled
-            if config.EMAIL_ENABLED:
-                try:
-                    subject = f"Re: Your Real Estate Inquiry - {category}"
-                    send_email_via_agent(
-                        to=request.email,
-                        subject=subject,
-                        body=response
-                    )
-                    logger.info(f"Email successfully sent to {request.email}")
-                except Exception as e:
-                    logger.error(f"Email sending failed for {request.email}: {e}")
-                    status = "failed"  # Optionally downgrade if email fails
-
-        except Exception as e:
-            logger.error(f"RAG response generation failed: {e}")
-            response = (
-                "We're currently unable to process your request. "
-                "Please contact support or try again later."
-            )
-            status = "failed"
-
-        return {
-            "email": request.email,
-            "category": category,
-            "response": response,
-            "status": status
-        }
 
+async def _cached_response(request: InquiryRequest, embedding_task, category_task):
+    """(cache entry or None, query embedding or None) once the lookup embedding is ready"""
+    if embedding_task is None:
+        return None, None
+    try:
+        query_embedding = await embedding_task
+        matches = response_cache.candidates(request.listing_id, query_embedding)
+        # Only wait on the category when there is something to compare it with
+        return response_cache.select(matches, (await category_task) if matches else None), query_embedding
     except Exception as e:
-        logger.exception("Unhandled exception while processing inquiry")
-        return {
-            "email": request.email,
-            "category": "Unknown",
-            "response": (
-                "An unexpected error occurred while processing your inquiry. "
-                "Please try again later or contact support."
-            ),
-            "status": "failed"
-        }
\ No newline at end of file
+        logger.warning(f"Response cache lookup failed: {e}")
+        return None, None
+
+
+def _cancel_pending(*tasks):
+    for task in tasks:
+        if task is not None and not task.done():
+            task.cancel()
+
+
+def _local_category(raw_query: str):
+    """Category from the local classifier, or None if it is disabled or unsure"""
+    if not config.CLASSIFIER_ENABLED:
+        return None
+    category = classify_locally(raw_query)
+    if category:
+        logger.info(f"Inquiry categorized locally as: {category}")
+    return category
+
+
+def _response_chain(category: str):
+    return (
+        category_prompts.get(category, category_prompts["General Inquiry"]) |
+        get_llm() |
+        parser
+    )
+
+
+async def aexpand_query(raw_query: str) -> str:
+    """Async stage: expand the inquiry message, falling back to the raw query"""
+    try:
+        expanded = await limited_call(
+            get_expand_chain().ainvoke, {"message": raw_query},
+            tokens=estimate_tokens(expand_prompt.template, raw_query)
+        )
+        logger.debug(f"Expanded query: {expanded}")
+        return expanded
+    except Exception as e:
+        logger.warning(f"Query expansion failed: {e}, using raw query")
+        return raw_query
+
+
+async def acategorize_query(raw_query: str) -> str:
+    """Async stage: categorize locally, asking the LLM only for ambiguous messages"""
+    category = _local_category(raw_query)
+    if category:
+        return category
+
+    try:
+        category = normalize_category(await limited_call(
+            get_category_chain().ainvoke, {"message": raw_query},
+            tokens=estimate_tokens(category_prompt.template, raw_query)
+        ))
+        logger.info(f"Inquiry categorized as: {category}")
+        return category
+    except Exception as e:
+        logger.error(f"Inquiry categorization failed: {e}")
+        return "General Inquiry"
+
+
+async def aretrieve_context(query: str, request: InquiryRequest) -> list:
+    """Async stage: exact listing facts plus filtered listing documents for the expanded query"""
+    facts = structured_context(request.message, request.listing_id)
+    return facts + await with_retries(aretrieve_listings, query, request.message, request.listing_id)
+
+
+async def astream_response(category: str, context: list, question: str) -> AsyncIterator[str]:
+    """Async stage: generate the category-specific response, yielding text as the LLM produces it"""
+    chain = _response_chain(category)
+    async for chunk in limited_stream(
+        lambda: chain.astream({"context": context, "question": question}),
+        tokens=estimate_tokens(question, *(document.page_content for document in context))
+    ):
+        yield chunk
+
+
+def reply_email(category: str, response: str, status: str) -> dict:
+    """
+    Subject and body of the reply email. Delivery happens later through the
+    outbox when the inquiry is saved, so it never adds to inquiry latency.
+    """
+    if status != "success":
+        return {}
+    return {
+        "email_title": f"Re: Your Real Estate Inquiry - {category}",
+        "email_body": response
+    }
+
+
+def _listing_ids(context: list) -> list:
+    """Distinct listing IDs in retrieval order"""
+    ids = []
+    for document in context:
+        listing_id = document.metadata.get("listing_id")
+        if listing_id is not None and listing_id not in ids:
+            ids.append(listing_id)
+    return ids
+
+
+async def astream_inquiry(request: InquiryRequest) -> AsyncIterator[Dict[str, Any]]:
+    """
+    Process a real estate inquiry end-to-end, reporting progress as it goes.
+
+    Stages run as a small DAG: expansion, categorization and the response-cache
+    embedding depend only on the raw message and run concurrently, then
+    retrieval and generation follow; a cache hit skips them.
+
+    Every network call goes through async APIs, so the event loop stays free
+    while an inquiry waits on OpenAI. At most MAX_CONCURRENT_INQUIRIES run at
+    once, and chat calls share the OpenAI rate-limit budget and retry transient
+    failures.
+
+    Yields {"event": ..., "data": ...} dicts: "stage" when a stage finishes,
+    "category", "listings" with the retrieved listing IDs, one "token" per
+    generated text chunk, "error" if generation fails, and finally "result"
+    with the inquiry result dict.
+    """
+    async with inquiry_semaphore:
+        timings = {}
+        start = time.perf_counter()
+        category_task = expand_task = embedding_task = None
+
+        def stage(name: str) -> Dict[str, Any]:
+            return {"event": "stage", "data": {"stage": name, "ms": timings.get(name)}}
+
+        try:
+            raw_query = request.message
+            logger.info(f"Processing inquiry from {request.email}")
+
+            # Steps 1 & 2: Expand and categorize the inquiry concurrently, alongside
+            # the embedding that near-duplicate inquiries are looked up by
+            category_task = asyncio.create_task(_atimed(timings, "categorize", acategorize_query(raw_query)))
+            expand_task = asyncio.create_task(_atimed(timings, "expand", aexpand_query(raw_query)))
+            embedding_task = _start_cache_lookup(timings, raw_query)
+
+            try:
+                # Near-duplicate inquiries about the same listing reuse a cached response
+                cached, query_embedding = await _cached_response(request, embedding_task, category_task)
+                if cached:
+                    expand_task.cancel()
+                    category = cached["category"]
+                    response = cached["response"]
+                    logger.info(f"Response cache hit (similarity {cached['similarity']:.3f})")
+                    yield {"event": "category", "data": {"category": category}}
+                    yield {"event": "token", "data": {"text": response}}
+                else:
+                    expanded = await expand_task
+                    yield stage("expand")
+                    category = await category_task
+                    yield stage("categorize")
+                    yield {"event": "category", "data": {"category": category}}
+
+                    # Step 3: Generate a response using RAG
+                    context = await _atimed(timings, "retrieve", aretrieve_context(expanded, request))
+                    yield stage("retrieve")
+                    yield {"event": "listings", "data": {"listing_ids": _listing_ids(context)}}
+
+                    generate_start = time.perf_counter()
+                    parts = []
+                    async for text in astream_response(category, context, expanded):
+                        if not parts:
+                            timings["first_token"] = round((time.perf_counter() - start) * 1000, 2)
+                        parts.append(text)
+                        yield {"event": "token", "data": {"text": text}}
+                    timings["generate"] = round((time.perf_counter() - generate_start) * 1000, 2)
+                    yield stage("generate")
+                    response = "".join(parts)
+                    logger.info("Successfully generated response via RAG")
+
+                    if query_embedding is not None:
+                        cost_ms = (time.perf_counter() - start) * 1000
+                        response_cache.put(category, request.listing_id, query_embedding, response, cost_ms)
+                status = "success"
+
+            except Exception as e:
+                logger.error(f"RAG response generation failed: {e}")
+                category = await category_task
+                response = FAILURE_RESPONSE
+                status = "failed"
+                yield {"event": "error", "data": {"detail": str(e)}}
+
+            timings["total"] = round((time.perf_counter() - start) * 1000, 2)
+            logger.info(f"Inquiry stage timings (ms): {timings}")
+
+            result = {
+                "email": request.email,
+                "category": category,
+                "response": response,
+                "status": status,
+                "timings": timings,
+                **reply_email(category, response, status)
+            }
+
+        except Exception:
+            logger.exception("Unhandled exception while processing inquiry")
+            result = {
+                "email": request.email,
+                "category": "Unknown",
+                "response": UNEXPECTED_ERROR_RESPONSE,
+                "status": "failed"
+            }
+
+        finally:
+            _cancel_pending(category_task, expand_task, embedding_task)
+
+        yield {"event": "result", "data": result}
+
+
+async def aprocess_inquiry(request: InquiryRequest) -> dict:
+    """Process a real estate inquiry end-to-end; the final result of astream_inquiry"""
+    result = None
+    async for item in astream_inquiry(request):
+        if item["event"] == "result":
+            result = item["data"]
+    return result
@@ -0,0 +1,118 @@
+from collections import OrderedDict, defaultdict
+from typing import Dict, List, Optional
+from app.config import config
+import math
+import threading
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(value * value for value in vector))
+    return [value / norm for value in vector] if norm else vector
+
+
+class SemanticResponseCache:
+    """
+    Cache of generated responses for near-duplicate inquiries.
+
+    Entries are bucketed by listing ID and matched on cosine similarity of the
+    inquiry embedding plus an exact category match. Entries expire after a TTL and
+    the least recently used entry is evicted once the cache is full.
+    """
+
+    def __init__(self, max_entries: int, ttl_seconds: float, threshold: float):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.threshold = threshold
+        self._entries: "OrderedDict[int, dict]" = OrderedDict()
+        self._buckets: Dict[Optional[str], set] = defaultdict(set)
+        self._next_id = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+        self.saved_ms = 0.0
+
+    def _drop(self, entry_id: int):
+        entry = self._entries.pop(entry_id)
+        bucket = self._buckets[entry["listing_id"]]
+        bucket.discard(entry_id)
+        if not bucket:
+            del self._buckets[entry["listing_id"]]
+
+    def candidates(self, listing_id: Optional[str], embedding: List[float]) -> List[dict]:
+        """Live entries for the listing whose embedding is within the similarity threshold"""
+        query = _normalize(embedding)
+        now = time.time()
+        matches = []
+        with self._lock:
+            for entry_id in list(self._buckets.get(listing_id, ())):
+                entry = self._entries[entry_id]
+                if now - entry["created_at"] > self.ttl_seconds:
+                    self._drop(entry_id)
+                    continue
+                similarity = sum(a * b for a, b in zip(query, entry["embedding"]))
+                if similarity >= self.threshold:
+                    matches.append({**entry, "id": entry_id, "similarity": similarity})
+        return sorted(matches, key=lambda match: match["similarity"], reverse=True)
+
+    def select(self, matches: List[dict], category: Optional[str]) -> Optional[dict]:
+        """Pick the best candidate for the category and record the hit or miss"""
+        with self._lock:
+            for match in matches:
+                if match["category"] == category and match["id"] in self._entries:
+                    self._entries.move_to_end(match["id"])
+                    self.hits += 1
+                    self.saved_ms += match["cost_ms"]
+                    return match
+            self.misses += 1
+        return None
+
+    def put(self, category: str, listing_id: Optional[str], embedding: List[float], response: str, cost_ms: float):
+        with self._lock:
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = {
+                "category": category,
+                "listing_id": listing_id,
+                "embedding": _normalize(embedding),
+                "response": response,
+                "cost_ms": cost_ms,
+                "created_at": time.time(),
+            }
+            self._buckets[listing_id].add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._drop(next(iter(self._entries)))
+                self.evictions += 1
+
+    def invalidate(self):
+        """Drop every entry, e.g. after the listing index changes"""
+        with self._lock:
+            self._entries.clear()
+            self._buckets.clear()
+            self.invalidations += 1
+        logger.info("Semantic response cache invalidated")
+
+    def stats(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "evictions": self.evictions,
+                "invalidations": self.invalidations,
+                "latency_saved_ms": round(self.saved_ms, 2),
+            }
+
+
+response_cache = SemanticResponseCache(
+    max_entries=config.RESPONSE_CACHE_SIZE,
+    ttl_seconds=config.RESPONSE_CACHE_TTL,
+    threshold=config.RESPONSE_CACHE_THRESHOLD
+)
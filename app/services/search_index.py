@@ -0,0 +1,193 @@
+"""
+Full-text index over inquiry history.
+
+SQLite deployments get an external-content FTS5 table kept in sync by triggers;
+Postgres gets a stored, weighted tsvector column with a GIN index. Both rank
+matches (bm25 / ts_rank_cd) and accept the same query syntax: bare words are
+ANDed, "quoted phrases" match adjacent words and a trailing * makes a prefix
+query. Other databases fall back to LIKE scans.
+"""
+
+from typing import List, Optional, Tuple
+from sqlalchemy import inspect, text
+from sqlalchemy.orm import Session
+from app.config import config
+from app.db.session import engine
+from app.db.models import InquiryHistory
+import re
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+SEARCH_FIELDS = ("message", "response", "email")
+# Postgres weight per field; SQLite bm25 weights follow the same order
+FIELD_WEIGHTS = {"message": "A", "response": "B", "email": "C"}
+BM25_WEIGHTS = "10.0, 5.0, 1.0"
+
+_TOKEN_PATTERN = re.compile(r'"([^"]*)"|(\S+)')
+_WORD_PATTERN = re.compile(r"[\w@.+-]+")
+
+_backend: Optional[str] = None
+_lock = threading.Lock()
+
+
+def parse_query(query: str) -> List[Tuple[List[str], bool]]:
+    """Split a query into (words, is_prefix) terms; a quoted phrase is one term"""
+    terms = []
+    for phrase, word in _TOKEN_PATTERN.findall(query):
+        if phrase:
+            words = _WORD_PATTERN.findall(phrase)
+            if words:
+                terms.append((words, False))
+        else:
+            prefix = word.endswith("*")
+            words = _WORD_PATTERN.findall(word.rstrip("*"))
+            if words:
+                terms.append((words, prefix and len(words) == 1))
+    return terms
+
+
+def _fts5_query(terms, field: Optional[str]) -> str:
+    parts = []
+    for words, prefix in terms:
+        phrase = '"' + " ".join(words).replace('"', '""') + '"'
+        parts.append(phrase + ("*" if prefix else ""))
+    expression = " AND ".join(parts)
+    return f"{field} : ({expression})" if field else expression
+
+
+def _tsquery(terms, field: Optional[str]) -> str:
+    weight = FIELD_WEIGHTS[field] if field else ""
+    parts = []
+    for words, prefix in terms:
+        lexemes = [
+            f"'{word}':" + ("*" if prefix else "") + weight if (prefix or weight) else f"'{word}'"
+            for word in (w.replace("'", "") for w in words)
+        ]
+        parts.append("(" + " <-> ".join(lexemes) + ")")
+    return " & ".join(parts)
+
+
+def _ensure_sqlite(conn) -> bool:
+    exists = conn.execute(text(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'inquiry_history_fts'"
+    )).first() is not None
+    conn.execute(text(
+        "CREATE VIRTUAL TABLE IF NOT EXISTS inquiry_history_fts USING fts5("
+        "message, response, email, content='inquiry_history', content_rowid='id')"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS inquiry_history_fts_ai AFTER INSERT ON inquiry_history BEGIN "
+        "INSERT INTO inquiry_history_fts(rowid, message, response, email) "
+        "VALUES (new.id, new.message, new.response, new.email); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS inquiry_history_fts_ad AFTER DELETE ON inquiry_history BEGIN "
+        "INSERT INTO inquiry_history_fts(inquiry_history_fts, rowid, message, response, email) "
+        "VALUES ('delete', old.id, old.message, old.response, old.email); END"
+    ))
+    conn.execute(text(
+        "CREATE TRIGGER IF NOT EXISTS inquiry_history_fts_au AFTER UPDATE ON inquiry_history BEGIN "
+        "INSERT INTO inquiry_history_fts(inquiry_history_fts, rowid, message, response, email) "
+        "VALUES ('delete', old.id, old.message, old.response, old.email); "
+        "INSERT INTO inquiry_history_fts(rowid, message, response, email) "
+        "VALUES (new.id, new.message, new.response, new.email); END"
+    ))
+    if not exists:
+        conn.execute(text("INSERT INTO inquiry_history_fts(inquiry_history_fts) VALUES ('rebuild')"))
+        logger.info("Built FTS5 index over existing inquiry history")
+    return True
+
+
+def _drop_sqlite():
+    """Remove a partly created FTS5 index so the next attempt rebuilds it from scratch"""
+    try:
+        with engine.begin() as conn:
+            for trigger in ("ai", "ad", "au"):
+                conn.execute(text(f"DROP TRIGGER IF EXISTS inquiry_history_fts_{trigger}"))
+            conn.execute(text("DROP TABLE IF EXISTS inquiry_history_fts"))
+    except Exception as e:
+        logger.error(f"Could not remove partial FTS5 index: {e}")
+
+
+def _ensure_postgres(conn) -> bool:
+    language = config.FULLTEXT_LANGUAGE
+    conn.execute(text(
+        "ALTER TABLE inquiry_history ADD COLUMN IF NOT EXISTS search_vector tsvector "
+        "GENERATED ALWAYS AS ("
+        f"setweight(to_tsvector('{language}', coalesce(message, '')), 'A') || "
+        f"setweight(to_tsvector('{language}', coalesce(response, '')), 'B') || "
+        "setweight(to_tsvector('simple', coalesce(email, '')), 'C')"
+        ") STORED"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_inquiry_history_search_vector "
+        "ON inquiry_history USING GIN (search_vector)"
+    ))
+    return True
+
+
+def ensure_search_index() -> str:
+    """Create the full-text index for this database if needed; returns the backend in use"""
+    global _backend
+    with _lock:
+        if _backend is not None:
+            return _backend
+        backend = "like"
+        if config.FULLTEXT_SEARCH_ENABLED:
+            if not inspect(engine).has_table(InquiryHistory.__tablename__):
+                # Called before the schema exists; decide once the table is there
+                logger.warning("inquiry_history does not exist yet; using LIKE search for now")
+                return backend
+            dialect = engine.dialect.name
+            try:
+                with engine.begin() as conn:
+                    if dialect == "sqlite" and _ensure_sqlite(conn):
+                        backend = "fts5"
+                    elif dialect == "postgresql" and _ensure_postgres(conn):
+                        backend = "tsvector"
+            except Exception as e:
+                logger.warning(f"Full-text index unavailable on {dialect}, using LIKE search: {e}")
+                if dialect == "sqlite":
+                    # pysqlite runs DDL outside the transaction, so undo what was created
+                    _drop_sqlite()
+        _backend = backend
+        logger.info(f"Inquiry search backend: {backend}")
+        return backend
+
+
+def _like_search(db_session: Session, query: str, field: Optional[str], limit: int) -> List[InquiryHistory]:
+    fields = [field] if field else list(SEARCH_FIELDS)
+    condition = None
+    for name in fields:
+        clause = getattr(InquiryHistory, name).contains(query)
+        condition = clause if condition is None else condition | clause
+    return db_session.query(InquiryHistory).filter(condition).limit(limit).all()
+
+
+def search_history(db_session: Session, query: str, field: Optional[str] = None, limit: int = 50) -> List[InquiryHistory]:
+    """Inquiry history rows matching query, most relevant first; field=None searches all fields"""
+    backend = ensure_search_index()
+    if backend == "like":
+        return _like_search(db_session, query, field, limit)
+
+    terms = parse_query(query)
+    if not terms:
+        return []
+
+    if backend == "fts5":
+        ids = db_session.execute(text(
+            "SELECT rowid FROM inquiry_history_fts WHERE inquiry_history_fts MATCH :query "
+            f"ORDER BY bm25(inquiry_history_fts, {BM25_WEIGHTS}) LIMIT :limit"
+        ), {"query": _fts5_query(terms, field), "limit": limit}).scalars().all()
+    else:
+        ids = db_session.execute(text(
+            "SELECT id FROM inquiry_history, to_tsquery(:language, :query) AS q "
+            "WHERE search_vector @@ q ORDER BY ts_rank_cd(search_vector, q) DESC LIMIT :limit"
+        ), {"language": config.FULLTEXT_LANGUAGE, "query": _tsquery(terms, field), "limit": limit}).scalars().all()
+
+    if not ids:
+        return []
+    rows = {row.id: row for row in db_session.query(InquiryHistory).filter(InquiryHistory.id.in_(ids))}
+    return [rows[i] for i in ids if i in rows]
@@ -1,56 +1,111 @@
 # app/utils/document_builder.py
 
+import hashlib
 import pandas as pd
+from typing import Iterator, List
 from langchain_core.documents import Document
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 
 
-def build_documents_from_csv(df: pd.DataFrame, chunk_size=1000, chunk_overlap=100):
+def _column(df: pd.DataFrame, name: str, default: str) -> pd.Series:
+    """Column as stripped strings, or the default for every row if it is missing"""
+    if name not in df.columns:
+        return pd.Series(default, index=df.index, dtype=object)
+    return df[name].astype(str).str.strip()
+
+
+def _raw_column(df: pd.DataFrame, name: str) -> list:
+    """Column values as native Python objects, or None for every row if it is missing"""
+    if name not in df.columns:
+        return [None] * len(df)
+    return df[name].tolist()
+
+
+def build_documents_from_csv(df: pd.DataFrame, chunk_size=1000, chunk_overlap=100) -> List[Document]:
     """
     Convert a DataFrame of listings into LangChain Document chunks using semantic text formatting
     and recursive character splitting.
+
+    Content strings and metadata are built column-wise; only listings longer than
+    chunk_size are passed through the text splitter.
     """
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=chunk_size,
-        chunk_overlap=chunk_overlap,
-        separators=["\n\n", "\n", ".", " "]
+    df = df[df.notna().any(axis=1)]  # Skip empty rows
+    if df.empty:
+        return []
+
+    # Build semantically rich strings for every row at once
+    content = (
+        _column(df, "Title", "") + ".\n"
+        + "Located at " + _column(df, "Address", "") + ", "
+        + _column(df, "City", "") + ", "
+        + _column(df, "State/Province", "") + " "
+        + _column(df, "ZIP/Postal Code", "") + ".\n"
+        + "Price: $" + _column(df, "Price", "N/A") + ", "
+        + _column(df, "Bedrooms", "N/A") + " bedrooms, "
+        + _column(df, "Bathrooms", "N/A") + " bathrooms, "
+        + _column(df, "Square Footage", "N/A") + " sq ft.\n"
+        + "Amenities: " + _column(df, "Amenities", "N/A") + "."
     )
+    content = (
+        content.str.replace("  ", " ", regex=False)
+        .str.replace(" .", ".", regex=False)
+        .str.strip()
+    )
+
+    metadata = {
+        "listing_id": _raw_column(df, "Listing ID"),
+        "city": _column(df, "City", "").tolist(),
+        "price": _raw_column(df, "Price"),
+        "bedrooms": _raw_column(df, "Bedrooms"),
+        "bathrooms": _raw_column(df, "Bathrooms"),
+    }
 
+    text_splitter = None
     documents = []
 
-    for _, row in df.iterrows():
-        if row.isnull().all():
-            continue  # Skip empty rows
-
-        # Build a semantically rich string
-        content = (
-            f"{str(row.get('Title', '')).strip()}.\n"
-            f"Located at {str(row.get('Address', '')).strip()}, "
-            f"{str(row.get('City', '')).strip()}, "
-            f"{str(row.get('State/Province', '')).strip()} "
-            f"{str(row.get('ZIP/Postal Code', '')).strip()}.\n"
-            f"Price: ${str(row.get('Price', 'N/A')).strip()}, "
-            f"{str(row.get('Bedrooms', 'N/A')).strip()} bedrooms, "
-            f"{str(row.get('Bathrooms', 'N/A')).strip()} bathrooms, "
-            f"{str(row.get('Square Footage', 'N/A')).strip()} sq ft.\n"
-            f"Amenities: {str(row.get('Amenities', 'N/A')).strip()}."
-        ).replace("  ", " ").replace(" .", ".").strip()
-
-        # Split into chunks
-        chunks = text_splitter.split_text(content)
+    for i, text in enumerate(content.tolist()):
+        row_metadata = {key: values[i] for key, values in metadata.items()}
 
-        for chunk in chunks:
-            documents.append(
-                Document(
-                    page_content=chunk,
-                    metadata={
-                        "listing_id": row.get("Listing ID", None),
-                        "city": str(row.get("City", "")).strip(),
-                        "price": row.get("Price", None),
-                        "bedrooms": row.get("Bedrooms", None),
-                        "bathrooms": row.get("Bathrooms", None),
-                    }
+        if len(text) <= chunk_size:
+            chunks = [text]
+        else:
+            if text_splitter is None:
+                from langchain_text_splitters import RecursiveCharacterTextSplitter
+                text_splitter = RecursiveCharacterTextSplitter(
+                    chunk_size=chunk_size,
+                    chunk_overlap=chunk_overlap,
+                    separators=["\n\n", "\n", ".", " "]
                 )
-            )
+            chunks = text_splitter.split_text(text)
+
+        for chunk in chunks:
+            documents.append(Document(page_content=chunk, metadata=dict(row_metadata)))
 
     return documents
+
+
+def iter_frames_from_csv(path_or_buffer, rows_per_batch=10000) -> Iterator[pd.DataFrame]:
+    """Stream a listings CSV in fixed-size row batches, every cell kept as the string in the file"""
+    yield from pd.read_csv(path_or_buffer, chunksize=rows_per_batch, dtype=str)
+
+
+def infer_types(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Give a dtype=str batch the numeric columns pd.read_csv would have inferred,
+    so documents (and their content-hash IDs) match a batch read without dtype.
+    """
+    typed = {}
+    for name in df.columns:
+        numbers = pd.to_numeric(df[name], errors="coerce")
+        typed[name] = numbers if numbers.notna().sum() == df[name].notna().sum() else df[name]
+    return pd.DataFrame(typed, index=df.index)
+
+
+def make_document_id(document: Document) -> str:
+    """
+    Derive a stable vectorstore ID from the listing ID and a hash of the chunk content,
+    so re-ingesting an unchanged listing produces the same IDs.
+    """
+    listing_id = document.metadata.get("listing_id")
+    content_hash = hashlib.sha256(document.page_content.encode("utf-8")).hexdigest()[:16]
+    prefix = "unlisted" if listing_id is None or pd.isna(listing_id) else str(listing_id).strip()
+    return f"{prefix}:{content_hash}"
@@ -0,0 +1,33 @@
+import pytest
+
+from app.core import classifier
+from app.core.classifier import InquiryClassifier, classify_locally, seed_examples, tokenize
+
+
+@pytest.fixture(autouse=True)
+def seed_classifier(monkeypatch):
+    monkeypatch.setattr(classifier, "_classifier", InquiryClassifier.train(seed_examples()))
+
+
+def test_tokenize_drops_stop_words():
+    assert tokenize("Is the house on the market?") == ["house", "market", "house market"]
+
+
+@pytest.mark.parametrize("message", [
+    "I want a 3 bed in Austin under 400k",
+    "I need a garage",
+    "Tell me about schools near the house",
+])
+def test_weak_matches_fall_back_to_llm(message):
+    assert classify_locally(message) is None
+
+
+@pytest.mark.parametrize("message, category", [
+    ("What is the price of this house?", "Price Inquiry"),
+    ("Is this home still on the market?", "Availability Check"),
+    ("Can I see the house this weekend?", "Schedule Visit"),
+    ("Is the area safe at night?", "Neighborhood Info"),
+    ("Do you accept VA loans?", "Financing Question"),
+])
+def test_clear_matches_are_labelled_locally(message, category):
+    assert classify_locally(message) == category
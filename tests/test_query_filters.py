@@ -0,0 +1,31 @@
+import pytest
+
+from app.core.query_filters import extract_constraints
+
+
+@pytest.mark.parametrize("message", [
+    "How far is the house from I-35? What is the bedroom count?",
+    "Any listings in Dover 19901?",
+    "Moreover 78704 is my zip code",
+    "Is the 2nd bedroom big enough for a crib?",
+    "Does the 2nd bath have a tub?",
+    "Can someone bathroom-check the plumbing?",
+])
+def test_ignores_numbers_inside_other_tokens(message):
+    assert extract_constraints(message) == {}
+
+
+@pytest.mark.parametrize("message, expected", [
+    ("3 bed near I-35 under 400k", {"bedrooms": 3.0, "max_price": 400000.0}),
+    ("In 78704 with 2 baths, at most $650,000", {"bathrooms": 2.0, "max_price": 650000.0}),
+    ("4bd 2ba between 300k and 450k", {"bedrooms": 4.0, "bathrooms": 2.0, "min_price": 300000.0, "max_price": 450000.0}),
+    ("two bedroom over $250k", {"bedrooms": 2.0, "min_price": 250000.0}),
+])
+def test_extracts_standalone_numbers(message, expected):
+    assert extract_constraints(message) == expected
+
+
+def test_recognizes_known_cities_only():
+    cities = {"austin": "Austin"}
+    assert extract_constraints("3 bed in Austin", cities) == {"bedrooms": 3.0, "city": "Austin"}
+    assert extract_constraints("3 bed in Dallas", cities) == {"bedrooms": 3.0}